@@ -0,0 +1,234 @@
+import asyncio
+
+import aiohttp
+
+
+class AsyncElmoV2API:
+    """
+    asyncio version of ElmoV2API. Every op is a coroutine and all of them share
+    one aiohttp connection pool, so head motion, LEDs, screen and audio can be
+    driven from the same event loop without threads.
+
+    Use it as an async context manager (or call close() when done):
+
+        async with AsyncElmoV2API(robot_ip) as robot:
+            await asyncio.gather(robot.set_pan(10), robot.set_screen(image="a.gif"))
+    """
+    PORT = 8001
+
+    def __init__(self, robot_ip, debug=False, pool_size=4, connect_timeout=1.0,
+                 read_timeout=3.0, retries=2, backoff_factor=0.1, port=None):
+        if port is not None:
+            self.PORT = port
+        self.REQUEST_PATH = f"http://{robot_ip}:{self.PORT}/"
+        self.GET_REQUEST_PATH = self.REQUEST_PATH + "status"
+        self.POST_COMMAND_PATH = self.REQUEST_PATH + "command"
+        self.debug = debug
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._session = None
+
+    @property
+    def session(self):
+        # Created lazily so the session is bound to the running event loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _request(self, method, url, **kwargs):
+        # Same policy as ElmoV2API: retry connection errors with exponential
+        # backoff; read timeouts and 502/503/504 only for GET, since a command
+        # the robot answered late may already have run
+        retry_reads = method == "GET"
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    if response.status in (502, 503, 504) and retry_reads and not last:
+                        raise aiohttp.ClientConnectionError(f"{response.status} from robot")
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+            except aiohttp.ClientConnectorError:
+                if last:
+                    raise
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if last or not retry_reads:
+                    raise
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    # Check the status of the robot
+    async def status(self):
+        try:
+            result = await self._request("GET", self.GET_REQUEST_PATH)
+
+            if self.debug:
+                print(result)
+
+            return result
+
+        except aiohttp.ClientResponseError as error:
+            print(error)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as error:
+            # Timeouts, dropped connections, answers that aren't JSON
+            print(f"Status request failed: {error!r}")
+
+    async def enable_behavior(self, name, control):
+        command = {
+            "op": "enable_behaviour",
+            "name": name,
+            "control": control,
+        }
+        await self.post_command(command)
+
+    async def set_pan_torque(self, control):
+        command = {
+            "op": "set_pan_torque",
+            "control": control,
+        }
+        await self.post_command(command)
+
+    async def set_pan(self, angle):
+        command = {
+            "op": "set_pan",
+            "angle": angle,
+        }
+        await self.post_command(command)
+
+    async def set_tilt_torque(self, control):
+        command = {
+            "op": "set_tilt_torque",
+            "control": control,
+        }
+        await self.post_command(command)
+
+    async def set_tilt(self, angle):
+        command = {
+            "op": "set_tilt",
+            "angle": angle,
+        }
+        await self.post_command(command)
+
+    async def play_sound(self, name):
+        command = {
+            "op": "play_sound",
+            "name": name,
+        }
+        await self.post_command(command)
+
+    async def play_audio(self, name):
+        command = {
+            "op": "play_audio",
+            "name": name,
+        }
+        await self.post_command(command)
+
+    async def set_volume(self, volume):
+        command = {
+            "op": "set_volume",
+            "volume": volume,
+        }
+        await self.post_command(command)
+
+    async def start_recording(self):
+        command = {
+            "op": "start_recording",
+        }
+        await self.post_command(command)
+
+    async def stop_recording(self):
+        command = {
+            "op": "stop_recording",
+        }
+        await self.post_command(command)
+
+    async def set_screen(self, image="", video="", text="", url=""):
+        command = {
+            "op": "set_screen",
+            "image": image,
+            "video": video,
+            "text": text,
+            "url": url
+        }
+        await self.post_command(command)
+
+    async def update_leds(self, colors):
+        command = {
+            "op": "update_leds",
+            "colors": colors,
+        }
+        await self.post_command(command)
+
+    async def update_leds_delta(self, indices, colors):
+        command = {
+            "op": "update_leds_delta",
+            "indices": indices,
+            "colors": colors,
+        }
+        await self.post_command(command)
+
+    async def update_leds_raw(self, data):
+        command = {
+            "op": "update_leds_raw",
+            "data": data,
+        }
+        await self.post_command(command)
+
+    async def update_leds_icon(self, name):
+        command = {
+            "op": "update_leds_icon",
+            "name": name,
+        }
+        await self.post_command(command)
+
+    async def start_video_recording(self):
+        command = {
+            "op": "start_video_recording",
+        }
+        await self.post_command(command)
+
+    async def stop_video_recording(self):
+        command = {
+            "op": "stop_video_recording",
+        }
+        await self.post_command(command)
+
+    async def reboot(self):
+        command = {
+            "op": "reboot",
+        }
+        await self.post_command(command)
+
+    async def shutdown(self):
+        command = {
+            "op": "shutdown",
+        }
+        await self.post_command(command)
+
+    async def post_command(self, command):
+        try:
+            result = await self._request("POST", self.POST_COMMAND_PATH, json=command)
+        except aiohttp.ClientResponseError as error:
+            print(error)
+            return
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as error:
+            # Timeouts, dropped connections, answers that aren't JSON
+            print(f"Command {command.get('op')} failed: {error!r}")
+            return
+
+        if self.debug:
+            print(result)
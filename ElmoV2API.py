@@ -1,20 +1,102 @@
+import contextlib
+import json
+import select
+import socket
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import telemetry
+from api_metrics import ApiMetrics
 
 class ElmoV2API:
     PORT = 8001
 
-    def __init__(self, robot_ip, debug=False):
+    def __init__(self, robot_ip, debug=False, pool_size=4, connect_timeout=1.0,
+                 read_timeout=3.0, retries=2, backoff_factor=0.1, batch_route=False, port=None):
+        """
+        pool_size: max number of keep-alive connections kept open to the robot.
+        connect_timeout / read_timeout: seconds, passed to every request.
+        retries: how many times a failed connection is retried. Status requests
+            are also retried after a read timeout or a 502/503/504; commands
+            are not, since the robot may already have run them (a late answer
+            to play_sound or reboot must not run it twice).
+        backoff_factor: retry n waits backoff_factor * 2^(n-1) seconds.
+        batch_route: set to True if the robot's /command handler accepts the
+            "batch" and "set_head" ops (see flush_batch). Otherwise batches are
+            pipelined over one connection as plain single-op requests.
+        port: server port, if the robot does not use the default PORT.
+        """
+        self.robot_ip = robot_ip
+        if port is not None:
+            self.PORT = port
         self.REQUEST_PATH = f"http://{robot_ip}:{self.PORT}/"
         self.GET_REQUEST_PATH = self.REQUEST_PATH + "status"
         self.POST_COMMAND_PATH = self.REQUEST_PATH + "command"
         self.debug = debug
+        self.timeout = (connect_timeout, read_timeout)
+
+        # One session for the whole client, so every command reuses an open
+        # TCP connection instead of doing a new handshake with the robot.
+        # allowed_methods only limits read and status retries: connect errors
+        # (nothing reached the robot) are retried for POST too.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+
+        # Batching state: queued commands are per thread, so the motion thread
+        # can batch its steps without picking up commands from the main thread
+        self.batch_route = batch_route
+        self._batch = threading.local()
+        self._pipe_sock = None
+        self._pipe_lock = threading.Lock()
+
+        # Per-op counts, errors, bytes and latency histograms (see metrics_snapshot)
+        self.metrics = ApiMetrics()
+
+    def close(self):
+        self.session.close()
+        with self._pipe_lock:
+            self._close_pipe()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---------- metrics ----------
+
+    def metrics_snapshot(self):
+        """{op: {count, errors, bytes, mean, p50, p95, p99, max}}, latencies in ms."""
+        return self.metrics.snapshot()
+
+    def serve_metrics(self, port=9100, host="127.0.0.1"):
+        """Prometheus-style text on http://host:port/metrics. Returns the server (.shutdown() to stop)."""
+        return self.metrics.serve(port=port, host=host)
 
     # Check the status of the robot and
     def status(self):
+        ok = False
+        start = time.perf_counter()
         try:
-            response = requests.get(self.GET_REQUEST_PATH)
+            response = self.session.get(self.GET_REQUEST_PATH, timeout=self.timeout)
             response.raise_for_status()
             # Additional code will only run if the request is successful
+            ok = True
 
             if self.debug:
                 print(response.json())
@@ -24,6 +106,13 @@ class ElmoV2API:
         except requests.exceptions.HTTPError as error:
             print(error)
 
+        except requests.exceptions.RequestException as error:
+            # Timeouts, dropped connections, exhausted retries
+            print(f"Status request failed: {error}")
+
+        finally:
+            self.metrics.record("status", time.perf_counter() - start, 0, ok)
+
 
     def enable_behavior(self, name, control):
         command = {
@@ -31,68 +120,77 @@ class ElmoV2API:
             "name": name,
             "control": control,
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def set_pan_torque(self, control):
         command = {
             "op": "set_pan_torque",
             "control": control,
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def set_pan(self, angle):
         command = {
             "op": "set_pan",
             "angle": angle,
         }
-        self.post_command(command)
+        return self.post_command(command)
+
+    def set_head(self, pan, tilt):
+        """Moves pan and tilt together, in a single round trip. True if the robot took both."""
+        commands = [{"op": "set_pan", "angle": pan}, {"op": "set_tilt", "angle": tilt}]
+        queue = getattr(self._batch, "queue", None)
+        if queue is not None:
+            queue.extend(commands)
+            return None
+        return all(self.flush_batch(commands))
 
     def set_tilt_torque(self, control):
         command = {
             "op": "set_tilt_torque",
             "control": control,
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def set_tilt(self, angle):
         command = {
             "op": "set_tilt",
             "angle": angle,
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def play_sound(self, name):
         command = {
             "op": "play_sound",
             "name": name,
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def play_audio(self, name):
         command = {
             "op": "play_audio",
             "name": name,
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def set_volume(self, volume):
         command = {
             "op": "set_volume",
             "volume": volume,
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def start_recording(self):
         command = {
             "op": "start_recording",
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def stop_recording(self):
         command = {
             "op": "stop_recording",
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def set_screen(self, image="", video="", text="", url=""):
         command = {
@@ -102,56 +200,284 @@ class ElmoV2API:
             "text": text,
             "url": url
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def update_leds(self, colors):
         command = {
             "op": "update_leds",
             "colors": colors,
         }
-        self.post_command(command)
+        return self.post_command(command)
+
+    # update_leds_delta / update_leds_raw need a matching handler on the robot
+    # (see led_state.LedStateTracker); the stock server only knows update_leds
+    def update_leds_delta(self, indices, colors):
+        command = {
+            "op": "update_leds_delta",
+            "indices": indices,
+            "colors": colors,
+        }
+        return self.post_command(command)
+
+    def update_leds_raw(self, data):
+        command = {
+            "op": "update_leds_raw",
+            "data": data,
+        }
+        return self.post_command(command)
 
     def update_leds_icon(self, name):
         command = {
             "op": "update_leds_icon",
             "name": name,
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def start_video_recording(self):
         command = {
             "op": "start_video_recording",
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def stop_video_recording(self):
         command = {
             "op": "stop_video_recording",
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def reboot(self):
         command = {
             "op": "reboot",
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def shutdown(self):
         command = {
             "op": "shutdown",
         }
-        self.post_command(command)
+        return self.post_command(command)
 
     def post_command(self, command):
+        queue = getattr(self._batch, "queue", None)
+        if queue is not None:
+            queue.append(command)
+            return
+
+        ok = True
+        response = None
+        start = time.perf_counter()
         try:
-            response = requests.post(self.POST_COMMAND_PATH, json=command)
+            response = self.session.post(self.POST_COMMAND_PATH, json=command, timeout=self.timeout)
             response.raise_for_status()
             # Additional code will only run if the request is successful
         except requests.exceptions.HTTPError as error:
             print(error)
+            ok = False
+        except requests.exceptions.RequestException as error:
+            # Timeouts, dropped connections, exhausted retries
+            print(f"Command {command.get('op')} failed: {error}")
+            ok = False
+        finally:
+            latency = time.perf_counter() - start
+            size = len(response.request.body or b"") if response is not None else 0
+            ok = ok and response is not None
+            self.metrics.record(command.get("op"), latency, size, ok)
+            if telemetry.enabled():
+                telemetry.record("command", op=command.get("op"), latency=latency, bytes=size, ok=ok)
 
-        if self.debug:
+        if self.debug and ok:
             print(response.json())
 
+        return ok
+
+    # ---------- batching ----------
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Queues every command sent inside the block and flushes them together
+        when the block ends:
+
+            with robot.batch():
+                robot.set_pan(10)
+                robot.set_tilt(-5)
+                robot.set_screen(image="happy.gif")
+
+        Nested batches are merged into the outermost one.
+        """
+        if getattr(self._batch, "queue", None) is not None:
+            yield
+            return
+
+        self._batch.queue = []
+        try:
+            yield
+        finally:
+            commands = self._batch.queue
+            self._batch.queue = None
+            self.flush_batch(commands)
+
+    def flush_batch(self, commands):
+        """Sends the commands together. Returns one ok flag per command."""
+        if not commands:
+            return []
+
+        if self.batch_route:
+            # Robot side: {"op": "batch", "commands": [...]} runs each command
+            # in order, and {"op": "set_head", "pan": p, "tilt": t} is set_pan
+            # followed by set_tilt.
+            merged = self._coalesce_head(commands)
+            if len(merged) == 1:
+                ok = self.post_command(merged[0])
+            else:
+                ok = self.post_command({"op": "batch", "commands": merged})
+            return [ok] * len(commands)
+
+        if len(commands) == 1:
+            return [self.post_command(commands[0])]
+
+        with self._pipe_lock:
+            oks, unsent = self._pipeline(commands)
+
+        rest = commands[len(oks):]
+        if unsent:
+            # These never reached the robot: send them the normal way
+            oks += [self.post_command(command) for command in rest]
+        elif rest:
+            # Written but never answered: the robot has most likely run them
+            # already, so they are reported as failed rather than sent twice
+            print(f"{len(rest)} batched commands unconfirmed: {[command.get('op') for command in rest]}")
+            for command in rest:
+                self.metrics.record(command.get("op"), 0.0, 0, False)
+            oks += [False] * len(rest)
+        return oks
+
+    @staticmethod
+    def _coalesce_head(commands):
+        """Merges a set_pan directly followed by a set_tilt (or the other way round) into set_head."""
+        merged = []
+        i = 0
+        while i < len(commands):
+            command = commands[i]
+            following = commands[i + 1] if i + 1 < len(commands) else None
+            ops = {command["op"], following["op"] if following else None}
+            if ops == {"set_pan", "set_tilt"}:
+                pan = command if command["op"] == "set_pan" else following
+                tilt = following if pan is command else command
+                merged.append({"op": "set_head", "pan": pan["angle"], "tilt": tilt["angle"]})
+                i += 2
+            else:
+                merged.append(command)
+                i += 1
+        return merged
+
+    def _close_pipe(self):
+        if self._pipe_sock is not None:
+            self._pipe_sock.close()
+            self._pipe_sock = None
+            self._pipe_file = None
+
+    def _pipeline(self, commands):
+        """
+        HTTP/1.1 pipelining: writes all requests back to back on one keep-alive
+        socket, then reads the responses in order. Returns (oks, unsent): an
+        ok flag per command that was answered, and whether the rest
+        provably never ran (the write itself failed, or the robot closed the
+        connection on purpose after the last answer).
+        """
+        host = f"{self.robot_ip}:{self.PORT}"
+        requests_bytes = b""
+        sizes = []
+        for command in commands:
+            body = json.dumps(command).encode("utf-8")
+            sizes.append(len(body))
+            requests_bytes += (
+                f"POST /command HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"\r\n"
+            ).encode("ascii") + body
+
+        oks = []
+        written = False
+        unsent = False
+        start = time.perf_counter()
+        try:
+            if self._pipe_sock is not None and self._pipe_dropped():
+                self._close_pipe()
+            if self._pipe_sock is None:
+                self._pipe_sock = socket.create_connection((self.robot_ip, self.PORT), timeout=self.timeout[0])
+                self._pipe_sock.settimeout(self.timeout[1])
+                self._pipe_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._pipe_file = self._pipe_sock.makefile("rb")
+
+            self._pipe_sock.sendall(requests_bytes)
+            written = True
+
+            for command in commands:
+                status, body, keep_alive = self._read_response(self._pipe_file)
+                # Latency of each command: from sending the batch until its own response
+                self.metrics.record(command.get("op"), time.perf_counter() - start, sizes[len(oks)], status < 400)
+                oks.append(status < 400)
+                if status >= 400:
+                    print(f"{status} Error for batched command: {body[:200]!r}")
+                elif self.debug:
+                    print(json.loads(body))
+                if not keep_alive:
+                    # The robot stops reading after a "Connection: close" answer
+                    self._close_pipe()
+                    unsent = True
+                    break
+
+        except (OSError, ValueError) as error:
+            print(f"Pipelined batch failed after {len(oks)} commands: {error}")
+            self._close_pipe()
+            unsent = not written
+
+        telemetry.record("batch", ops=[command.get("op") for command in commands], bytes=len(requests_bytes),
+                         latency=time.perf_counter() - start, done=len(oks))
+        return oks, unsent
+
+    def _pipe_dropped(self):
+        """True if the robot closed the idle pipeline socket (readable with nothing pending = EOF)."""
+        try:
+            readable, _, _ = select.select([self._pipe_sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    @staticmethod
+    def _read_response(fp):
+        status_line = fp.readline()
+        if not status_line:
+            raise ValueError("connection closed by robot")
+        version, status = status_line.split(None, 2)[:2]
+
+        headers = {}
+        while True:
+            line = fp.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
 
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int(fp.readline().split(b";")[0], 16)
+                if size == 0:
+                    fp.readline()
+                    break
+                body += fp.read(size)
+                fp.readline()
+        elif "content-length" in headers:
+            body = fp.read(int(headers["content-length"]))
+        else:
+            # No length: the body runs until the robot closes the connection
+            body = fp.read()
+            return int(status), body, False
 
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" and not (version == b"HTTP/1.0" and connection != "keep-alive")
+        return int(status), body, keep_alive
@@ -0,0 +1,169 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram resolution: 2^SUB_BITS buckets per power of two (~3% error)
+SUB_BITS = 5
+MAX_MICROS = 1 << 36  # ~19 hours, anything longer lands in the last bucket
+
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram: log-linear buckets over microseconds, so
+    recording is O(1), memory is fixed (~1000 counters) and every
+    percentile is within about 3% of the true value from 1 us to hours.
+    """
+
+    SUB_COUNT = 1 << SUB_BITS
+
+    def __init__(self):
+        self.counts = [0] * self._index(MAX_MICROS - 1) + [0]
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def _index(cls, micros):
+        exponent = micros.bit_length() - 1
+        if exponent < SUB_BITS:
+            return micros  # small values are exact
+        sub = (micros >> (exponent - SUB_BITS)) - cls.SUB_COUNT
+        return (exponent - SUB_BITS + 1) * cls.SUB_COUNT + sub
+
+    @classmethod
+    def _value(cls, index):
+        """Middle of the bucket, in microseconds."""
+        if index < cls.SUB_COUNT:
+            return float(index)
+        exponent = index // cls.SUB_COUNT + SUB_BITS - 1
+        sub = index % cls.SUB_COUNT
+        width = 1 << (exponent - SUB_BITS)
+        return float((cls.SUB_COUNT + sub) * width) + width / 2.0
+
+    def record(self, seconds):
+        micros = min(MAX_MICROS - 1, max(0, int(seconds * 1e6)))
+        self.counts[self._index(micros)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """p in 0-100 -> seconds (0.0 if empty)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(p / 100.0 * self.count)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self._value(index) / 1e6, self.max)
+        return self.max
+
+
+class ApiMetrics:
+    """
+    Per-op counters for an ElmoV2API: requests, errors, payload bytes and a
+    LatencyHistogram each. record() is called by the client for every
+    request; snapshot() and prometheus_text() read them out.
+    """
+
+    QUANTILES = (50, 95, 99)
+
+    def __init__(self):
+        self._ops = {}
+        self._lock = threading.Lock()
+
+    def record(self, op, latency, payload_bytes=0, ok=True):
+        with self._lock:
+            stats = self._ops.get(op)
+            if stats is None:
+                stats = self._ops[op] = {"count": 0, "errors": 0, "bytes": 0, "latency": LatencyHistogram()}
+            stats["count"] += 1
+            stats["bytes"] += payload_bytes or 0
+            if not ok:
+                stats["errors"] += 1
+            stats["latency"].record(latency)
+
+    def reset(self):
+        with self._lock:
+            self._ops = {}
+
+    def snapshot(self):
+        """
+        {op: {"count", "errors", "bytes", "mean", "p50", "p95", "p99", "max"}},
+        latencies in milliseconds.
+        """
+        with self._lock:
+            result = {}
+            for op, stats in self._ops.items():
+                histogram = stats["latency"]
+                entry = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "bytes": stats["bytes"],
+                    "mean": histogram.total / histogram.count * 1000 if histogram.count else 0.0,
+                    "max": histogram.max * 1000,
+                }
+                for q in self.QUANTILES:
+                    entry[f"p{q}"] = histogram.percentile(q) * 1000
+                result[op] = entry
+            return result
+
+    def prometheus_text(self, prefix="elmo"):
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            ops = sorted(self._ops.items())
+            lines = [
+                f"# HELP {prefix}_requests_total Requests sent to the robot, per op.",
+                f"# TYPE {prefix}_requests_total counter",
+            ]
+            lines += [f'{prefix}_requests_total{{op="{op}"}} {s["count"]}' for op, s in ops]
+            lines += [
+                f"# HELP {prefix}_errors_total Failed requests, per op.",
+                f"# TYPE {prefix}_errors_total counter",
+            ]
+            lines += [f'{prefix}_errors_total{{op="{op}"}} {s["errors"]}' for op, s in ops]
+            lines += [
+                f"# HELP {prefix}_request_bytes_total Request payload bytes, per op.",
+                f"# TYPE {prefix}_request_bytes_total counter",
+            ]
+            lines += [f'{prefix}_request_bytes_total{{op="{op}"}} {s["bytes"]}' for op, s in ops]
+            lines += [
+                f"# HELP {prefix}_request_latency_seconds Request latency, per op.",
+                f"# TYPE {prefix}_request_latency_seconds summary",
+            ]
+            for op, s in ops:
+                histogram = s["latency"]
+                for q in self.QUANTILES:
+                    lines.append(f'{prefix}_request_latency_seconds{{op="{op}",quantile="{q / 100}"}} '
+                                 f'{histogram.percentile(q):.6f}')
+                lines.append(f'{prefix}_request_latency_seconds_sum{{op="{op}"}} {histogram.total:.6f}')
+                lines.append(f'{prefix}_request_latency_seconds_count{{op="{op}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9100, host="127.0.0.1"):
+        """
+        Serves prometheus_text() on http://host:port/metrics from a background
+        thread. Returns the server (call .shutdown() to stop it).
+        """
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,102 @@
+import contextlib
+import hashlib
+import json
+import os
+import wave
+
+SOUND_DIRS = ("Sounds/Human", "Sounds/Robotic")
+MANIFEST_FILE = ".audio_index.json"
+
+
+def read_wav_info(path):
+    """Duration, sample rate and frame count from the WAV header."""
+    with contextlib.closing(wave.open(path, 'r')) as f:
+        frames = f.getnframes()
+        rate = f.getframerate()
+    return {"duration": frames / float(rate), "sample_rate": rate, "frames": frames}
+
+
+class AudioIndex:
+    """
+    Duration, sample rate and checksum of every WAV in the sound folders,
+    read once at startup so playback never has to open a file.
+
+    The result is saved to a manifest; on the next start only files whose
+    size or modification time changed are read again.
+
+        index = AudioIndex()
+        index.duration("Sounds/Robotic/chest_error.wav")   # seconds, or None
+        index.missing(["hmm.wav", "typo.wav"], "Sounds/Human")
+    """
+
+    def __init__(self, sound_dirs=SOUND_DIRS, manifest_path=MANIFEST_FILE):
+        self.sound_dirs = sound_dirs
+        self.manifest_path = manifest_path
+        self.entries = {}
+        self.refresh()
+
+    def refresh(self):
+        """Scans the sound folders, reusing manifest entries for unchanged files."""
+        cached = self._load_manifest()
+        entries = {}
+        changed = False
+
+        for directory in self.sound_dirs:
+            if not os.path.isdir(directory):
+                print(f"[AUDIO] Sound folder not found: {directory}")
+                continue
+            for name in sorted(os.listdir(directory)):
+                if not name.lower().endswith(".wav"):
+                    continue
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+
+                entry = cached.get(path)
+                if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+                    entries[path] = entry
+                    continue
+
+                try:
+                    entry = read_wav_info(path)
+                except (wave.Error, EOFError, OSError) as e:
+                    print(f"[AUDIO] Could not read {path}: {e}")
+                    continue
+                with open(path, "rb") as f:
+                    entry["sha1"] = hashlib.sha1(f.read()).hexdigest()
+                entry["size"] = stat.st_size
+                entry["mtime"] = stat.st_mtime_ns
+                entries[path] = entry
+                changed = True
+
+        if changed or set(entries) != set(cached):
+            self._save_manifest(entries)
+        self.entries = entries
+        return self
+
+    def get(self, path):
+        """Manifest entry (duration, sample_rate, frames, sha1, size, mtime) or None."""
+        return self.entries.get(os.path.normpath(path))
+
+    def duration(self, path, default=None):
+        entry = self.get(path)
+        return entry["duration"] if entry else default
+
+    def missing(self, filenames, directory):
+        """The filenames that are not in the index for that folder."""
+        return [name for name in filenames if self.get(os.path.join(directory, name)) is None]
+
+    # ---------- manifest ----------
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, entries):
+        try:
+            with open(self.manifest_path, "w") as f:
+                json.dump(entries, f, indent=2)
+        except OSError as e:
+            print(f"[AUDIO] Could not write manifest {self.manifest_path}: {e}")
@@ -0,0 +1,55 @@
+import sys
+import time
+
+import requests
+
+from ElmoV2API import ElmoV2API
+from elmo_simulator import ElmoSimulator
+
+
+# --- CONFIGURATION ---
+N_COMMANDS = 500
+# ---------------------
+
+
+def start_stand_in_server(port=ElmoV2API.PORT, latency=0.0):
+    """A local ElmoSimulator (HTTP only) standing in for the robot."""
+    return ElmoSimulator(host="127.0.0.1", http_port=port, latency=latency).start()
+
+
+def bench_bare_requests(url, n):
+    """What ElmoV2API used to do: a new connection for every command."""
+    start = time.perf_counter()
+    for i in range(n):
+        requests.post(url, json={"op": "set_pan", "angle": i % 40})
+    return n / (time.perf_counter() - start)
+
+
+def bench_pooled_api(robot, n):
+    start = time.perf_counter()
+    for i in range(n):
+        robot.set_pan(i % 40)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else ElmoV2API.PORT
+    # Optional simulated network latency, in ms
+    latency = float(sys.argv[2]) / 1000.0 if len(sys.argv) > 2 else 0.0
+    server = start_stand_in_server(port, latency)
+
+    try:
+        with ElmoV2API("127.0.0.1", port=server.http_port) as robot:
+            bare = bench_bare_requests(robot.POST_COMMAND_PATH, N_COMMANDS)
+            pooled = bench_pooled_api(robot, N_COMMANDS)
+
+        print(f"Commands sent: {N_COMMANDS}")
+        print(f"Bare requests.post : {bare:8.1f} cmd/s")
+        print(f"Pooled ElmoV2API   : {pooled:8.1f} cmd/s")
+        print(f"Speed-up           : {pooled / bare:8.2f}x")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from elmo_simulator import draw_camera_frame
+from face_tracking import FaceDetector
+
+# --- CONFIGURATION ---
+# A recorded video, or a directory of frames (sorted by name). Without one,
+# frames from the simulator camera are used (a drawn face sweeping across)
+DEFAULT_RECORDING = "face_recording.mp4"
+MAX_FRAMES = 300
+# Boxes overlapping at least this much (intersection over union) count as the same face
+MIN_IOU = 0.5
+# ---------------------
+
+
+def load_frames(path, max_frames=MAX_FRAMES):
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.png")) + glob.glob(os.path.join(path, "*.jpg")))
+        return [cv2.imread(f) for f in files[:max_frames]]
+
+    frames = []
+    cap = cv2.VideoCapture(path)
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def simulated_frames(count=MAX_FRAMES):
+    """The simulator's camera while the head sweeps slowly left and right past the person."""
+    frames = []
+    for i in range(count):
+        pan = -10.0 + 18.0 * np.sin(2 * np.pi * i / 150.0)
+        tilt = -5.0 + 4.0 * np.sin(2 * np.pi * i / 90.0)
+        rgb = np.asarray(draw_camera_frame(pan, tilt, timestamp=False))
+        frames.append(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+    return frames
+
+
+def full_frame_detect(classifier, frame):
+    """What center_player used to do: full resolution, whole frame, every time."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    faces = classifier.detectMultiScale(gray, 1.1, 5, minSize=(100, 100))
+    if len(faces) == 0:
+        return None
+    return tuple(max(faces, key=lambda f: f[2] * f[3]))
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = w * h
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_RECORDING
+    if len(sys.argv) == 1 and not os.path.exists(path):
+        print(f"{path} not found, using simulated camera frames")
+        path = "simulator"
+        frames = simulated_frames()
+    else:
+        frames = [f for f in load_frames(path) if f is not None]
+    if not frames:
+        print(f"No frames found in {path}")
+        print("Usage: python benchmark_face_detection.py <video file | frame directory>")
+        sys.exit(1)
+
+    detector = FaceDetector()
+
+    start = time.perf_counter()
+    reference = [full_frame_detect(detector.classifier, frame) for frame in frames]
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tracked = [detector.detect(frame) for frame in frames]
+    fast_time = time.perf_counter() - start
+
+    # Agreement with the full-frame search
+    both = sum(1 for a, b in zip(reference, tracked) if a is not None and b is not None and iou(a, b) >= MIN_IOU)
+    found_ref = sum(1 for a in reference if a is not None)
+    found_fast = sum(1 for b in tracked if b is not None)
+
+    print(f"Frames      : {len(frames)} ({frames[0].shape[1]}x{frames[0].shape[0]})")
+    print(f"Full frame  : {len(frames) / full_time:7.1f} detections/s, face in {found_ref} frames")
+    print(f"Tracked ROI : {len(frames) / fast_time:7.1f} detections/s, face in {found_fast} frames "
+          f"({detector.roi_searches} ROI / {detector.full_searches} full searches)")
+    print(f"Speed-up    : {full_time / fast_time:7.2f}x")
+    if found_ref:
+        print(f"Agreement   : {both}/{found_ref} reference faces matched (IoU >= {MIN_IOU})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import glob
+import sys
+import time
+
+import numpy as np
+
+from led_frames import fast_image_to_rgb_array, image_to_rgb_array
+
+# --- CONFIGURATION ---
+FRAMES_GLOB = "Emotions/led_grid/*.png"
+PARAMS = {"contrast": 2.5, "color": 1.5, "brightness": 0.9}
+# Largest acceptable per-channel difference against the PIL chain (the palette
+# path is meant to be exact)
+MAX_DIFF = 0
+# ---------------------
+
+
+def main():
+    files = sorted(glob.glob(FRAMES_GLOB))
+    if not files:
+        print(f"No frames found for {FRAMES_GLOB}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    reference = np.stack([image_to_rgb_array(path, **PARAMS) for path in files])
+    pil_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast = fast_image_to_rgb_array(files, **PARAMS)
+    fast_time = time.perf_counter() - start
+
+    # Parity with the PIL chain
+    diff = np.abs(reference.astype(int) - fast.astype(int))
+    print(f"Frames: {len(files)}")
+    print(f"PIL chain   : {pil_time * 1000 / len(files):7.2f} ms/frame")
+    print(f"Palette     : {fast_time * 1000 / len(files):7.2f} ms/frame")
+    print(f"Speed-up    : {pil_time / fast_time:7.2f}x")
+    print(f"Difference  : mean {diff.mean():.2f}, p99 {np.percentile(diff, 99):.0f}, max {diff.max()} (0-255)")
+
+    if diff.max() > MAX_DIFF:
+        print(f"PARITY FAILED: {np.count_nonzero(diff > MAX_DIFF)} values differ by more than {MAX_DIFF}")
+        sys.exit(1)
+    print("Parity OK")
+
+
+if __name__ == "__main__":
+    main()
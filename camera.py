@@ -0,0 +1,221 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+import requests
+
+JPEG_START = b"\xff\xd8"
+JPEG_END = b"\xff\xd9"
+
+
+class FrameSource:
+    """
+    A camera that keeps capturing on background threads and always holds the
+    latest frame, so read() never waits for the device or the network.
+
+    Subclasses start their threads in _threads() and call _publish_frame()
+    for every new frame.
+    """
+
+    def __init__(self, timeout=3.0):
+        self.timeout = timeout
+
+        self._frame = None
+        self._frame_time = 0.0
+        self._last_publish = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._running = []
+
+        self.frames_captured = 0
+        self.fps = 0.0
+
+    def start(self):
+        self._stop.clear()
+        self._running = [threading.Thread(target=target, daemon=True) for target in self._threads()]
+        for t in self._running:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._running:
+            t.join(timeout=self.timeout)
+        self._running = []
+
+    def read(self):
+        """Latest frame (BGR), or None if nothing has arrived yet."""
+        return self._frame
+
+    def wait_frame(self, timeout=None):
+        """Like read(), but waits for the first frame to arrive."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._frame is not None or self._stop.is_set(), timeout)
+            return self._frame
+
+    def frame_age(self):
+        """Seconds since the latest frame was captured."""
+        if self._frame is None:
+            return None
+        return time.monotonic() - self._frame_time
+
+    def _threads(self):
+        raise NotImplementedError
+
+    def _publish_frame(self, frame):
+        now = time.monotonic()
+        with self._cond:
+            self._frame = frame
+            self._frame_time = now
+            self.frames_captured += 1
+            if self._last_publish is not None:
+                # Smoothed frames per second
+                self.fps = 0.9 * self.fps + 0.1 / max(now - self._last_publish, 1e-6)
+            self._last_publish = now
+            self._cond.notify_all()
+
+
+class WebcamSource(FrameSource):
+    """Local camera: opened once, then read continuously on a background thread."""
+
+    def __init__(self, device=1, width=640, height=480, timeout=3.0):
+        super().__init__(timeout=timeout)
+        self.device = device
+        self.width = width
+        self.height = height
+
+    def _threads(self):
+        return [self._capture_loop]
+
+    def _capture_loop(self):
+        cap = cv2.VideoCapture(self.device)
+        if not cap.isOpened():
+            print(f"[CAMERA] Failed to open camera {self.device}", flush=True)
+            return
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+
+        try:
+            while not self._stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    print("[CAMERA] Failed to capture frame", flush=True)
+                    self._stop.wait(0.1)
+                    continue
+                self._publish_frame(frame)
+        finally:
+            cap.release()
+
+
+class MjpegStream(FrameSource):
+    """
+    Persistent reader for the robot camera (http://<ip>:8080/stream.mjpg).
+
+    One HTTP connection stays open. A reader thread copies what arrives into a
+    preallocated buffer and cuts out JPEGs by their start/end markers,
+    scanning only the new bytes. A decoder thread turns the most recent JPEG
+    into a BGR frame (older undecoded JPEGs are dropped).
+    """
+
+    def __init__(self, url, buffer_size=4 * 1024 * 1024, chunk_size=64 * 1024, timeout=3.0):
+        super().__init__(timeout=timeout)
+        self.url = url
+        self.chunk_size = chunk_size
+
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._jpeg = None
+
+        self.frames_received = 0
+
+    def _threads(self):
+        return [self._read_loop, self._decode_loop]
+
+    # ---------- threads ----------
+
+    def _read_loop(self):
+        while not self._stop.is_set():
+            try:
+                with requests.get(self.url, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    self._parse(response.raw)
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                print(f"[CAMERA] Stream error: {e}, reconnecting...", flush=True)
+                self._stop.wait(1.0)
+
+    def _parse(self, raw):
+        buf, view = self._buffer, self._view
+        end = 0       # bytes currently in the buffer
+        scan = 0      # where to continue looking for markers
+        start = -1    # position of the current frame's JPEG_START
+
+        while not self._stop.is_set():
+            if end + self.chunk_size > len(buf):
+                # Out of room: keep only the partial frame (or nothing) and move it to the front
+                keep_from = start if start >= 0 else end
+                remaining = end - keep_from
+                if remaining + self.chunk_size > len(buf):
+                    remaining = 0  # frame larger than the buffer, drop it
+                    start = -1
+                buf[:remaining] = view[keep_from:keep_from + remaining]
+                end = remaining
+                scan = 0 if start < 0 else max(0, scan - keep_from)
+                if start >= 0:
+                    start = 0
+
+            # read1 returns whatever has arrived (up to chunk_size) instead of
+            # blocking until a whole chunk is filled, so frames are not delayed
+            data = raw.read1(self.chunk_size)
+            if not data:
+                return
+            n = len(data)
+            view[end:end + n] = data
+            end += n
+
+            while True:
+                if start < 0:
+                    start = buf.find(JPEG_START, max(0, scan - 1), end)
+                    if start < 0:
+                        scan = end
+                        break
+                    scan = start + 2
+                stop = buf.find(JPEG_END, max(start + 2, scan - 1), end)
+                if stop < 0:
+                    scan = end
+                    break
+
+                self._publish_jpeg(bytes(view[start:stop + 2]))
+                scan = stop + 2
+                start = -1
+
+            if start < 0 and scan == end:
+                # Nothing pending: rewind to the front of the buffer for free,
+                # keeping a trailing 0xff in case it is half of the next JPEG_START
+                if end and buf[end - 1] == 0xff:
+                    buf[0] = 0xff
+                    end = scan = 1
+                else:
+                    end = scan = 0
+
+    def _publish_jpeg(self, jpeg):
+        with self._cond:
+            self._jpeg = jpeg
+            self.frames_received += 1
+            self._cond.notify_all()
+
+    def _decode_loop(self):
+        while not self._stop.is_set():
+            with self._cond:
+                self._cond.wait_for(lambda: self._jpeg is not None or self._stop.is_set())
+                jpeg, self._jpeg = self._jpeg, None
+            if jpeg is None:
+                continue
+
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                self._publish_frame(frame)
@@ -0,0 +1,162 @@
+import threading
+
+from ElmoV2API import ElmoV2API
+
+
+class CommandQueue:
+    """
+    Latest-wins outgoing queue in front of an ElmoV2API.
+
+    Each actuator (pan, tilt, leds, screen) has a single pending slot. A new
+    setpoint replaces the one still waiting in its slot, so when the link is
+    slower than the caller, stale setpoints are dropped instead of piling up.
+    A background thread sends whatever is pending (as one batch) as soon as
+    the previous send returns.
+
+    Sounds (and anything else given to post_command without an actuator
+    slot) are queued too, but never dropped: they go out in order, after the
+    setpoints of the same batch. Callers like the Scheduler's callbacks can
+    then hand over any command without waiting for the robot.
+
+    Other ops (status, torque, behaviours...) are passed straight through to
+    the wrapped api.
+
+    submit, send and post_command take an optional on_sent(ok) callback,
+    called from the sender thread once the command has been sent. A command
+    dropped for a newer one in its slot is never sent, so it gets no call.
+    """
+
+    ACTUATORS = {
+        "set_pan": "pan",
+        "set_tilt": "tilt",
+        "update_leds": "leds",
+        "update_leds_icon": "leds",
+        "set_screen": "screen",
+    }
+
+    def __init__(self, api: ElmoV2API):
+        self.api = api
+
+        self._pending = {}
+        self._ordered = []
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._metrics = {
+            actuator: {"submitted": 0, "sent": 0, "failed": 0, "dropped": 0}
+            for actuator in list(dict.fromkeys(self.ACTUATORS.values())) + ["ordered"]
+        }
+        self._stop = False
+
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        # Everything that is not queued goes directly to the robot
+        return getattr(self.api, name)
+
+    # ---------- queued ops ----------
+
+    def set_pan(self, angle):
+        self.submit({"op": "set_pan", "angle": angle})
+
+    def set_tilt(self, angle):
+        self.submit({"op": "set_tilt", "angle": angle})
+
+    def set_head(self, pan, tilt):
+        with self._cond:
+            self.set_pan(pan)
+            self.set_tilt(tilt)
+
+    def set_screen(self, image="", video="", text="", url=""):
+        self.submit({"op": "set_screen", "image": image, "video": video, "text": text, "url": url})
+
+    def update_leds(self, colors):
+        self.submit({"op": "update_leds", "colors": colors})
+
+    def update_leds_icon(self, name):
+        self.submit({"op": "update_leds_icon", "name": name})
+
+    def play_sound(self, name):
+        self.send({"op": "play_sound", "name": name})
+
+    def play_audio(self, name):
+        self.send({"op": "play_audio", "name": name})
+
+    def post_command(self, command, on_sent=None):
+        """Queues any command: latest-wins if it has an actuator slot, else in order. Returns None."""
+        if command.get("op") in self.ACTUATORS:
+            self.submit(command, on_sent)
+        else:
+            self.send(command, on_sent)
+
+    def send(self, command, on_sent=None):
+        """Queues a command that must not be dropped (sounds...), after the ones already queued."""
+        with self._cond:
+            self._ordered.append((command, on_sent))
+            self._metrics["ordered"]["submitted"] += 1
+            self._cond.notify()
+
+    def submit(self, command, on_sent=None):
+        actuator = self.ACTUATORS[command["op"]]
+        with self._cond:
+            if actuator in self._pending:
+                self._metrics[actuator]["dropped"] += 1
+            self._pending[actuator] = (command, on_sent)
+            self._metrics[actuator]["submitted"] += 1
+            self._cond.notify()
+
+    # ---------- control ----------
+
+    def metrics(self):
+        """
+        Per-actuator counts of submitted, sent, failed and dropped (superseded)
+        commands; "ordered" counts the commands queued without a slot.
+        """
+        with self._cond:
+            return {actuator: dict(counts) for actuator, counts in self._metrics.items()}
+
+    def flush(self, timeout=None):
+        """Blocks until every pending command has been sent. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._ordered and not self._in_flight,
+                                       timeout)
+
+    def stop(self, timeout=1.0):
+        """Sends what is still pending (waiting up to timeout seconds), then stops the sender."""
+        self.flush(timeout)
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._ordered or self._stop)
+                if self._stop:
+                    return
+                pending, ordered = self._pending, self._ordered
+                self._pending, self._ordered = {}, []
+                self._in_flight = len(pending) + len(ordered)
+
+            entries = list(pending.values()) + ordered
+            commands = [command for command, _ in entries]
+            try:
+                oks = self.api.flush_batch(commands)
+            except Exception as e:
+                print(f"[QUEUE] Send error: {e}", flush=True)
+                oks = [False] * len(commands)
+
+            # Callbacks run before flush() returns, so a flushed caller sees their effects
+            for (_, on_sent), ok in zip(entries, oks):
+                if on_sent is not None:
+                    try:
+                        on_sent(ok)
+                    except Exception as e:
+                        print(f"[QUEUE] Callback error: {e}", flush=True)
+
+            with self._cond:
+                for actuator, ok in zip(list(pending) + ["ordered"] * len(ordered), oks):
+                    self._metrics[actuator]["sent" if ok else "failed"] += 1
+                self._in_flight = 0
+                self._cond.notify_all()
@@ -1,8 +1,11 @@
 from test import ElmoEmotionManager
 from ElmoV2API import ElmoV2API
+from find_elmo_ip import find_robot_ip
+from scheduler import default_scheduler
 import time
 
-ROBOT_IP = "192.168.0.104"  # your Elmo IP
+# Cached robots are checked first, a broadcast scan only runs if none answers
+ROBOT_IP = find_robot_ip(default="192.168.0.104")  # fallback: your Elmo IP
 
 elmo = ElmoEmotionManager(ElmoV2API(ROBOT_IP))
 
@@ -30,8 +33,8 @@ try:
     '''
     elmo.set_emotion("fear")
 
-    while True:
-        pass
+    # The motion runs on the scheduler thread; just idle until Ctrl+C
+    default_scheduler().wait()
 
 except KeyboardInterrupt:
     elmo.stop()
@@ -1,4 +1,8 @@
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 from moviepy import VideoFileClip, CompositeVideoClip
 
 # --- CONFIGURATION ---
@@ -6,11 +10,16 @@ INPUT_FOLDER = "Emotions/robotic_voices"
 OUTPUT_FOLDER = "Emotions/robotic_voices/output_videos"
 TARGET_WIDTH = 1920
 TARGET_HEIGHT = 1080
+# Videos encoded at the same time (one process each)
+WORKERS = os.cpu_count() or 1
+# ffmpeg threads per video; the pool already keeps every core busy
+FFMPEG_THREADS = 1
 
 
 # ---------------------
 
-def crop_and_pad(input_path, output_path):
+def crop_and_pad(input_path, output_path, threads=None, logger="bar"):
+    """Crops the video to a centered square and pads it to TARGET_WIDTH x TARGET_HEIGHT. Raises on failure."""
     clip = None
     final_clip = None
     try:
@@ -46,32 +55,81 @@ def crop_and_pad(input_path, output_path):
             output_path,
             fps=clip.fps if clip.fps else 30,  # Keep original FPS or default to 30
             codec="libx264",
-            audio_codec="aac"
+            audio_codec="aac",
+            threads=threads,
+            logger=logger
         )
 
-    except Exception as e:
-        print(f"Error processing {input_path}: {e}")
-
     finally:
         # clean up resources
         if clip: clip.close()
         if final_clip: final_clip.close()
 
 
-def main():
+def is_up_to_date(input_path, output_path):
+    """True if the output exists and is newer than its input."""
+    return os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+
+
+def transcode(input_path, output_path):
+    """
+    Runs in a worker process. Writes to a temporary file first, so an
+    interrupted run never leaves a half-written output that looks up to date.
+    Returns (seconds, error message or None).
+    """
+    start = time.perf_counter()
+    folder, name = os.path.split(output_path)
+    tmp_path = os.path.join(folder, f".tmp_{name}")
+    try:
+        crop_and_pad(input_path, tmp_path, threads=FFMPEG_THREADS, logger=None)
+        os.replace(tmp_path, output_path)
+        return time.perf_counter() - start, None
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return time.perf_counter() - start, str(e)
+
+
+def main(force=False):
     if not os.path.exists(OUTPUT_FOLDER):
         os.makedirs(OUTPUT_FOLDER)
 
-    for filename in os.listdir(INPUT_FOLDER):
+    jobs = []
+    skipped = 0
+    for filename in sorted(os.listdir(INPUT_FOLDER)):
         if filename.lower().endswith(".mp4"):
             input_path = os.path.join(INPUT_FOLDER, filename)
             output_path = os.path.join(OUTPUT_FOLDER, f"1920_square_{filename}")
-
-            print(f"Processing: {filename}...")
-            crop_and_pad(input_path, output_path)
-
-    print("Batch processing complete!")
+            if not force and is_up_to_date(input_path, output_path):
+                skipped += 1
+                continue
+            jobs.append((filename, input_path, output_path))
+
+    print(f"{len(jobs)} videos to process, {skipped} up to date, {WORKERS} workers")
+    start = time.perf_counter()
+    failed = []
+
+    with ProcessPoolExecutor(max_workers=WORKERS) as pool:
+        futures = {pool.submit(transcode, input_path, output_path): filename
+                   for filename, input_path, output_path in jobs}
+        for done, future in enumerate(as_completed(futures), 1):
+            filename = futures[future]
+            try:
+                seconds, error = future.result()
+            except Exception as e:  # worker process died
+                seconds, error = 0.0, str(e)
+            if error:
+                failed.append(filename)
+                print(f"[{done}/{len(jobs)}] Error processing {filename}: {error}")
+            else:
+                print(f"[{done}/{len(jobs)}] {filename} done in {seconds:.1f}s")
+
+    print(f"Batch processing complete! {len(jobs) - len(failed)} processed, {skipped} skipped, "
+          f"{len(failed)} failed, in {time.perf_counter() - start:.1f}s")
+    return failed
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # --force re-encodes everything, even up-to-date outputs
+    if main(force="--force" in sys.argv):
+        sys.exit(1)
@@ -1,55 +1,8 @@
 import sys
 import os
 from ElmoV2API import ElmoV2API
-from PIL import Image, ImageEnhance  # Added ImageEnhance
-import numpy as np
-
-
-def image_to_rgb_array(image_path, contrast=2.0, color=1.5, brightness=0.8):
-    """
-    contrast: 1.0 is original. >1.0 makes darks darker and lights lighter.
-    color: 1.0 is original. >1.0 makes colors more vibrant (saturation).
-    brightness: 1.0 is original. <1.0 makes the whole image darker.
-    """
-    try:
-        with Image.open(image_path) as img:
-            # 1. Convert to RGB
-            img = img.convert('RGB')
-
-            # 2. ENHANCE IMAGE (Fixing the "Very Light" issue)
-            # Adjust Contrast
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(contrast)
-
-            # Adjust Color (Saturation)
-            enhancer = ImageEnhance.Color(img)
-            img = enhancer.enhance(color)
-
-            # Adjust Brightness (Optional: prevents "washed out" look)
-            enhancer = ImageEnhance.Brightness(img)
-            img = enhancer.enhance(brightness)
-
-            # 3. Resize to 13x13
-            # Using LANCZOS is high quality, but if you want a "blocky" look,
-            # change Resampling.LANCZOS to Resampling.NEAREST
-            img_resized = img.resize((13, 13), resample=Image.Resampling.LANCZOS)
-
-            # 4. Convert to NumPy array
-            rgb_array = np.array(img_resized)
-
-            # 5. Clean up low values (Optional "Gamma" fix)
-            # This forces weak pixels (like dark grey noise) to become pure black (0)
-            # Any pixel value less than 30 becomes 0
-            rgb_array[rgb_array < 30] = 0
-
-            return rgb_array
-
-    except FileNotFoundError:
-        print(f"Error: The file '{image_path}' was not found.")
-        return None
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return None
+from led_frames import image_to_rgb_array, to_led_payload
+from PIL import Image
 
 
 if __name__ == '__main__':
@@ -88,8 +41,7 @@ if __name__ == '__main__':
 
     if numpy_grid is not None:
         # 5. Format for the Robot API
-        flat_grid = numpy_grid.reshape(-1, 3)
-        led_argument = flat_grid.tolist()
+        led_argument = to_led_payload(numpy_grid)
 
         print(f"Sending {len(led_argument)} pixels to the robot...")
 
@@ -0,0 +1,408 @@
+import argparse
+import base64
+import io
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from find_elmo_ip import DISCOVERY_MESSAGE, DISCOVERY_PORT
+
+# --- CONFIGURATION ---
+HTTP_PORT = 8001
+STREAM_PORT = 8080
+LED_COUNT = 13 * 13
+PAN_LIMITS = (-40.0, 40.0)
+TILT_LIMITS = (-90.0, 90.0)
+# Camera field of view, as in face_tracking.py
+PAN_FOV = 62.2
+TILT_FOV = 48.8
+# ---------------------
+
+
+class SimulatedElmo:
+    """
+    State of a simulated robot, updated by the same commands ElmoV2API sends
+    (including batch, set_head, update_leds_delta and update_leds_raw).
+    """
+
+    def __init__(self, name="elmo-sim"):
+        self.name = name
+        self.lock = threading.Lock()
+        self.state = {
+            "pan": 0.0,
+            "tilt": 0.0,
+            "pan_min": PAN_LIMITS[0],
+            "pan_max": PAN_LIMITS[1],
+            "tilt_min": TILT_LIMITS[0],
+            "tilt_max": TILT_LIMITS[1],
+            "pan_torque": False,
+            "tilt_torque": False,
+            "behaviours": {"look_around": True, "blush": True},
+            "screen": {"image": "", "video": "", "text": "", "url": ""},
+            "leds": [[0, 0, 0] for _ in range(LED_COUNT)],
+            "leds_icon": "",
+            "sound": "",
+            "volume": 100,
+            "recording": False,
+            "video_recording": False,
+        }
+        self.commands = {}
+
+    def status(self):
+        with self.lock:
+            return json.loads(json.dumps(self.state))
+
+    def apply(self, command):
+        """Runs one command. Returns an error string, or None if it was accepted."""
+        op = command.get("op")
+        if op == "batch":
+            for sub in command.get("commands", []):
+                error = self.apply(sub)
+                if error:
+                    return error
+            return None
+
+        with self.lock:
+            self.commands[op] = self.commands.get(op, 0) + 1
+            s = self.state
+            if op == "set_pan":
+                s["pan"] = max(s["pan_min"], min(s["pan_max"], float(command["angle"])))
+            elif op == "set_tilt":
+                s["tilt"] = max(s["tilt_min"], min(s["tilt_max"], float(command["angle"])))
+            elif op == "set_head":
+                s["pan"] = max(s["pan_min"], min(s["pan_max"], float(command["pan"])))
+                s["tilt"] = max(s["tilt_min"], min(s["tilt_max"], float(command["tilt"])))
+            elif op in ("set_pan_torque", "set_tilt_torque"):
+                s[op[4:]] = bool(command["control"])
+            elif op == "enable_behaviour":
+                s["behaviours"][command["name"]] = bool(command["control"])
+            elif op == "set_screen":
+                s["screen"] = {key: command.get(key, "") for key in ("image", "video", "text", "url")}
+            elif op == "update_leds":
+                if len(command["colors"]) != LED_COUNT:
+                    return f"update_leds needs {LED_COUNT} colors"
+                s["leds"] = [list(color) for color in command["colors"]]
+            elif op == "update_leds_delta":
+                for index, color in zip(command["indices"], command["colors"]):
+                    s["leds"][index] = list(color)
+            elif op == "update_leds_raw":
+                data = base64.b64decode(command["data"])
+                if len(data) != LED_COUNT * 3:
+                    return f"update_leds_raw needs {LED_COUNT * 3} bytes"
+                s["leds"] = [list(data[i:i + 3]) for i in range(0, len(data), 3)]
+            elif op == "update_leds_icon":
+                s["leds_icon"] = command["name"]
+            elif op in ("play_sound", "play_audio"):
+                s["sound"] = command["name"]
+            elif op == "set_volume":
+                s["volume"] = command["volume"]
+            elif op in ("start_recording", "stop_recording"):
+                s["recording"] = op == "start_recording"
+            elif op in ("start_video_recording", "stop_video_recording"):
+                s["video_recording"] = op == "start_video_recording"
+            elif op in ("reboot", "shutdown"):
+                pass
+            else:
+                return f"unknown op {op!r}"
+        return None
+
+
+# ---------- camera ----------
+
+def draw_camera_frame(pan, tilt, person=(10.0, 5.0), size=(640, 480), timestamp=True):
+    """
+    What the robot's camera would see: a person at person=(pan, tilt)
+    degrees, shifted by where the head points, on a dark background. The
+    face is drawn with brows, eyes, nose and mouth (and slightly blurred)
+    so the Haar cascade in face_tracking.py finds it. Returns an RGB image.
+    """
+    img = Image.new("RGB", size, (40, 40, 40))
+    draw = ImageDraw.Draw(img)
+    x = size[0] / 2 + (person[0] + pan) * size[0] / PAN_FOV
+    y = size[1] / 2 - (person[1] + tilt) * size[1] / TILT_FOV
+    s = size[1] / 480.0
+
+    draw.ellipse((x - 70 * s, y - 90 * s, x + 70 * s, y + 90 * s), fill=(205, 170, 145))
+    draw.chord((x - 74 * s, y - 98 * s, x + 74 * s, y + 18 * s), 180, 360, fill=(60, 40, 30))  # hair
+    for side in (-1, 1):
+        ex, ey = x + side * 28 * s, y - 18 * s
+        draw.rectangle((ex - 20 * s, ey - 22 * s, ex + 20 * s, ey - 15 * s), fill=(70, 50, 40))
+        draw.ellipse((ex - 16 * s, ey - 7 * s, ex + 16 * s, ey + 7 * s), fill=(250, 250, 250))
+        draw.ellipse((ex - 7 * s, ey - 7 * s, ex + 7 * s, ey + 7 * s), fill=(40, 30, 30))
+    draw.polygon([(x, y - 10 * s), (x - 10 * s, y + 22 * s), (x + 10 * s, y + 22 * s)], fill=(185, 145, 120))
+    draw.ellipse((x - 26 * s, y + 38 * s, x + 26 * s, y + 52 * s), fill=(150, 60, 60))
+    img = img.filter(ImageFilter.GaussianBlur(2 * s))
+
+    if timestamp:
+        ImageDraw.Draw(img).text((10, 10), time.strftime("%H:%M:%S"), fill=(255, 255, 255))
+    return img
+
+
+class ElmoSimulator:
+    """
+    A fake Elmo on this machine, for benchmarks and regression tests without
+    hardware:
+
+    - /status and /command on http_port (HTTP/1.1 keep-alive, pipelining works)
+    - a fake camera on stream_port (/stream.mjpg), unless it is None
+    - an answer to 'ruarobot' discovery broadcasts on udp_port, unless it is None
+
+    Port 0 picks a free port (for any of the three); after start() the
+    attributes hold the real one.
+
+    latency / jitter: seconds added to every HTTP reply (jitter is the
+    standard deviation of a normal distribution, never below 0).
+    failure_rate: fraction of commands answered with 503 (and applied not at all).
+    drop_rate: fraction of requests where the connection is just closed.
+    person: (pan, tilt) in degrees where the simulated person stands, drawn
+        on the camera frames relative to where the head points.
+
+        with ElmoSimulator(http_port=18001, latency=0.005) as sim:
+            robot = ElmoV2API("127.0.0.1", port=18001)
+            robot.set_pan(10)
+            assert sim.robot.status()["pan"] == 10
+    """
+
+    def __init__(self, name="elmo-sim", host="0.0.0.0", http_port=HTTP_PORT, stream_port=None,
+                 udp_port=None, latency=0.0, jitter=0.0, failure_rate=0.0, drop_rate=0.0,
+                 stream_fps=15, person=(10.0, 5.0), seed=None):
+        self.robot = SimulatedElmo(name)
+        self.host = host
+        self.http_port = http_port
+        self.stream_port = stream_port
+        self.udp_port = udp_port
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.stream_fps = stream_fps
+        self.person = person
+
+        self.requests = 0
+        self.failures = 0
+        self.drops = 0
+
+        self._random = random.Random(seed)
+        self._fault_lock = threading.Lock()
+        self._servers = []
+        self._udp_sock = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self):
+        self._stop.clear()
+        # Port 0 picks a free port; the attributes then hold the real one
+        self.http_port = self._serve(self.http_port, self._api_handler())
+        if self.stream_port is not None:
+            self.stream_port = self._serve(self.stream_port, self._stream_handler())
+        if self.udp_port is not None:
+            self._udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._udp_sock.bind((self.host, self.udp_port))
+            self.udp_port = self._udp_sock.getsockname()[1]
+            self._udp_sock.settimeout(0.5)
+            self._spawn(self._discovery_loop)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers = []
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
+        if self._udp_sock is not None:
+            self._udp_sock.close()
+            self._udp_sock = None
+
+    # ---------- fault injection ----------
+
+    def _delay(self):
+        with self._fault_lock:
+            delay = self.latency + (self._random.gauss(0.0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _fault(self):
+        """None, "drop" or "fail" for the request being handled."""
+        # Handler threads share the counters and the seeded random generator
+        with self._fault_lock:
+            self.requests += 1
+            roll = self._random.random()
+            if roll < self.drop_rate:
+                self.drops += 1
+                return "drop"
+            if roll < self.drop_rate + self.failure_rate:
+                self.failures += 1
+                return "fail"
+            return None
+
+    # ---------- servers ----------
+
+    def _spawn(self, target):
+        t = threading.Thread(target=target, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _serve(self, port, handler):
+        server = ThreadingHTTPServer((self.host, port), handler)
+        server.daemon_threads = True
+        self._servers.append(server)
+        self._spawn(server.serve_forever)
+        return server.server_address[1]
+
+    def _api_handler(self):
+        sim = self
+
+        class ApiHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the robot's server
+            disable_nagle_algorithm = True
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _handle(self, run):
+                fault = sim._fault()
+                sim._delay()
+                if fault == "drop":
+                    self.close_connection = True
+                    return
+                if fault == "fail":
+                    self._reply(503, {"result": False, "error": "simulated failure"})
+                    return
+                status, body = run()
+                self._reply(status, body)
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/status":
+                    self._reply(404, {"error": "not found"})
+                    return
+                self._handle(lambda: (200, sim.robot.status()))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if self.path.split("?")[0] != "/command":
+                    self._reply(404, {"error": "not found"})
+                    return
+
+                def run():
+                    try:
+                        error = sim.robot.apply(json.loads(body))
+                    except (ValueError, KeyError, TypeError) as e:
+                        error = f"bad command: {e}"
+                    if error:
+                        return 400, {"result": False, "error": error}
+                    return 200, {"result": True}
+                self._handle(run)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ApiHandler
+
+    def _stream_handler(self):
+        sim = self
+
+        class StreamHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/stream.mjpg":
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=FRAME")
+                self.end_headers()
+                period = 1.0 / sim.stream_fps
+                next_frame = time.monotonic()
+                try:
+                    while not sim._stop.is_set():
+                        jpeg = sim._camera_frame()
+                        self.wfile.write(b"--FRAME\r\nContent-Type: image/jpeg\r\n"
+                                         b"Content-Length: %d\r\n\r\n" % len(jpeg) + jpeg + b"\r\n")
+                        next_frame += period
+                        sim._stop.wait(max(0.0, next_frame - time.monotonic()))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return StreamHandler
+
+    def _camera_frame(self, size=(640, 480)):
+        """A JPEG of draw_camera_frame for the current head position (the face centers as the head follows)."""
+        with self.robot.lock:
+            pan, tilt = self.robot.state["pan"], self.robot.state["tilt"]
+        img = draw_camera_frame(pan, tilt, self.person, size)
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=70)
+        return out.getvalue()
+
+    def _discovery_loop(self):
+        reply = f"iamarobot;elmo;{self.robot.name};{self.http_port}".encode("utf-8")
+        while not self._stop.is_set():
+            try:
+                data, address = self._udp_sock.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if data.startswith(DISCOVERY_MESSAGE):
+                self._udp_sock.sendto(reply, address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated Elmo for benchmarks and tests without hardware.")
+    parser.add_argument("--name", default="elmo-sim")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--http-port", type=int, default=HTTP_PORT, help="0 picks a free port (same for the others)")
+    parser.add_argument("--stream-port", type=int, default=STREAM_PORT)
+    parser.add_argument("--udp-port", type=int, default=DISCOVERY_PORT)
+    parser.add_argument("--no-stream", action="store_true", help="no camera stream")
+    parser.add_argument("--no-discovery", action="store_true", help="no discovery replies")
+    parser.add_argument("--latency", type=float, default=0.0, help="ms added to every reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="ms, standard deviation of the added latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of connections closed unanswered")
+    args = parser.parse_args()
+
+    sim = ElmoSimulator(name=args.name, host=args.host, http_port=args.http_port,
+                        stream_port=None if args.no_stream else args.stream_port,
+                        udp_port=None if args.no_discovery else args.udp_port,
+                        latency=args.latency / 1000.0, jitter=args.jitter / 1000.0,
+                        failure_rate=args.failure_rate, drop_rate=args.drop_rate).start()
+    print(f"Simulated Elmo '{args.name}' on http://{args.host}:{sim.http_port}/status")
+    if sim.stream_port is not None:
+        print(f"Camera stream on http://{args.host}:{sim.stream_port}/stream.mjpg")
+    if sim.udp_port is not None:
+        print(f"Answering discovery on UDP {sim.udp_port}")
+
+    try:
+        while True:
+            time.sleep(5)
+            print(f"[SIM] requests {sim.requests}, failures {sim.failures}, drops {sim.drops}, "
+                  f"pan {sim.robot.state['pan']:.1f}, tilt {sim.robot.state['tilt']:.1f}", flush=True)
+    except KeyboardInterrupt:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+
+import cv2
+
+# Camera field of view, used to turn pixel offsets into angles
+PAN_FOV = 62.2
+TILT_FOV = 48.8
+
+
+def check_tilt_angle(angle):
+    """
+    Checks if the tilt angle is valid. If it is not valid then returns a
+    valid angle.
+
+    Returns:
+        int: The angle
+    """
+    if angle > 15:
+        angle = 15
+    elif angle < -15:
+        angle = -15
+    return angle
+
+
+def check_pan_angle(angle):
+    """
+    Checks if the pan angle is valid. If it is not valid then returns a
+    valid angle.
+
+    Returns:
+        int: The angle
+    """
+    if angle > 40:
+        angle = 40
+    elif angle < -40:
+        angle = -40
+    return angle
+
+
+def angle_correction(face, frame_width, frame_height):
+    """
+    (x, y, w, h) face box -> (pan, tilt) correction in degrees that would
+    bring the face to the center of the frame.
+    """
+    x, y, w, h = face
+    horizontal_offset = (x + w / 2) - frame_width / 2
+    vertical_offset = frame_height / 2 - (y + h / 2)
+
+    horizontal_adjustment = (horizontal_offset / frame_width) * PAN_FOV
+    vertical_adjustment = (vertical_offset / frame_height) * TILT_FOV
+    return horizontal_adjustment, vertical_adjustment
+
+
+class FaceDetector:
+    """
+    Haar cascade face detector tuned for continuous tracking.
+
+    - the classifier is loaded once (from the repo's own
+      haarcascade_frontalface_default.xml, else OpenCV's copy)
+    - detection runs on a downscaled grayscale image
+    - while a face is being tracked, only a region of interest around the
+      last detection is searched, for faces of about the same size; the
+      whole frame is searched every full_search_every frames, or as soon
+      as the face is lost
+    """
+
+    def __init__(self, cascade_path=None, min_size=(100, 100), scale=0.5,
+                 full_search_every=10, roi_margin=0.5):
+        """
+        min_size: smallest face, in pixels of the original frame.
+        scale: detection image size relative to the frame (0.5 = half).
+        roi_margin: ROI = last face box grown by this fraction of its size on each side.
+        """
+        if cascade_path is None:
+            cascade_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                        "haarcascade_frontalface_default.xml")
+            if not os.path.exists(cascade_path):
+                cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        self.classifier = cv2.CascadeClassifier(cascade_path)
+        self.min_size = min_size
+        self.scale = scale
+        self.full_search_every = full_search_every
+        self.roi_margin = roi_margin
+
+        self._last = None  # last face, in detection-image coordinates
+        self._since_full = 0
+        self.full_searches = 0
+        self.roi_searches = 0
+
+    def detect(self, frame):
+        """Largest face in the BGR frame as (x, y, w, h) in frame pixels, or None."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+        face = None
+        if self._last is not None and self._since_full < self.full_search_every:
+            face = self._detect_roi(gray)
+            self._since_full += 1
+        if face is None:
+            face = self._detect_full(gray)
+            self._since_full = 0
+
+        self._last = face
+        if face is None:
+            return None
+        return tuple(int(round(v / self.scale)) for v in face)
+
+    def reset(self):
+        self._last = None
+
+    def _detect_full(self, gray):
+        self.full_searches += 1
+        min_size = (int(self.min_size[0] * self.scale), int(self.min_size[1] * self.scale))
+        faces = self.classifier.detectMultiScale(gray, 1.1, 5, minSize=min_size)
+        if len(faces) == 0:
+            return None
+        return tuple(max(faces, key=lambda f: f[2] * f[3]))
+
+    def _detect_roi(self, gray):
+        self.roi_searches += 1
+        x, y, w, h = self._last
+        mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(gray.shape[1], x + w + mx), min(gray.shape[0], y + h + my)
+
+        # Faces move, but don't change size much between two frames
+        faces = self.classifier.detectMultiScale(
+            gray[y0:y1, x0:x1], 1.1, 5,
+            minSize=(int(w * 0.7), int(h * 0.7)), maxSize=(int(w * 1.4), int(h * 1.4)),
+        )
+        if len(faces) == 0:
+            return None
+        fx, fy, fw, fh = max(faces, key=lambda f: f[2] * f[3])
+        return fx + x0, fy + y0, fw, fh
+
+
+class FaceTracker:
+    """
+    Closed-loop head control: at a fixed rate, takes the newest camera frame,
+    finds the face and moves pan/tilt towards it.
+
+    Only a fraction (gain) of the correction is applied per tick, because
+    the next frame usually still shows the head before the last move;
+    corrections below the deadband are ignored to avoid jitter.
+
+    stats() publishes the achieved loop rate and the latency from frame
+    capture to the pan/tilt command.
+    """
+
+    def __init__(self, api, frame_source, status_cache=None, detector=None,
+                 rate_hz=10.0, gain=0.5, deadband=2.0, resync_interval=2.0):
+        """
+        api: ElmoV2API, or better a CommandQueue, so a slow link only
+            delays the newest setpoint instead of queueing old ones.
+        frame_source: a started FrameSource (WebcamSource / MjpegStream).
+        status_cache: StatusCache for the current pan/tilt (else api.status()).
+        resync_interval: seconds between re-reads of the actual pan/tilt, so
+            the setpoint doesn't drift from where the head really is
+            (None: only read once at start).
+        """
+        self.api = api
+        self.source = frame_source
+        self.status_cache = status_cache
+        self.detector = detector or FaceDetector()
+        self.period = 1.0 / rate_hz
+        self.gain = gain
+        self.deadband = deadband
+        self.resync_interval = resync_interval
+
+        self.pan = 0.0
+        self.tilt = 0.0
+        self._last_sync = 0.0
+        self.resync()
+
+        self.loop_rate = 0.0
+        self.latency = 0.0
+        self.faces_seen = 0
+        self.ticks = 0
+
+        self._last_frame = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def stats(self):
+        return {
+            "loop_rate": self.loop_rate,
+            "latency": self.latency,
+            "faces_seen": self.faces_seen,
+            "ticks": self.ticks,
+        }
+
+    def resync(self):
+        """Takes pan/tilt from the robot's status (keeps the old values if there is none)."""
+        status = (self.status_cache.get() if self.status_cache else self.api.status()) or {}
+        self.pan = float(status.get("pan", self.pan))
+        self.tilt = float(status.get("tilt", self.tilt))
+        self._last_sync = time.monotonic()
+
+    def step(self):
+        """One control tick. Returns True if the head was moved."""
+        frame = self.source.read()
+        if frame is None or frame is self._last_frame:
+            return False  # no new frame since the last tick
+        self._last_frame = frame
+        frame_age = self.source.frame_age() or 0.0
+        start = time.monotonic()
+
+        face = self.detector.detect(frame)
+        if face is None:
+            return False
+        self.faces_seen += 1
+
+        if self.resync_interval and start - self._last_sync >= self.resync_interval:
+            self.resync()
+        pan_adjustment, tilt_adjustment = angle_correction(face, frame.shape[1], frame.shape[0])
+        if abs(pan_adjustment) < self.deadband and abs(tilt_adjustment) < self.deadband:
+            return False
+
+        self.pan = check_pan_angle(self.pan - self.gain * pan_adjustment)
+        self.tilt = check_tilt_angle(self.tilt - self.gain * tilt_adjustment)
+        self.api.set_head(self.pan, self.tilt)
+
+        latency = frame_age + (time.monotonic() - start)
+        self.latency = latency if not self.latency else 0.8 * self.latency + 0.2 * latency
+        return True
+
+    def _loop(self):
+        next_tick = time.monotonic()
+        last = None
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                print(f"[TRACKING] Error: {e}", flush=True)
+
+            now = time.monotonic()
+            self.ticks += 1
+            if last is not None:
+                rate = 1.0 / max(now - last, 1e-6)
+                self.loop_rate = rate if not self.loop_rate else 0.8 * self.loop_rate + 0.2 * rate
+            last = now
+
+            # Fixed rate: schedule from the previous deadline, not from now
+            next_tick += self.period
+            if next_tick < now:
+                next_tick = now
+            self._stop.wait(next_tick - now)
@@ -1,12 +1,17 @@
+import json
+import selectors
 import socket
-import netifaces
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+import netifaces
+import requests
 
-CONTEXT = {
-    "scanning_robots": False,
-    "robot_model": ""
-}
+DISCOVERY_PORT = 5000
+DISCOVERY_MESSAGE = b'ruarobot'
+# Robots found in earlier sessions, re-checked before broadcasting again
+CACHE_FILE = ".elmo_robots.json"
 
 
 def callback(robot_name, robot_address):
@@ -14,83 +19,252 @@ def callback(robot_name, robot_address):
     print(f"Found robot: {robot_name} at {robot_address}")
 
 
-def scan_robots(cb, models=[]):
-    def scan_robots_runnable():
-        # 1. Keep a persistent set of IPs we have already found
-        found_ips = set()
+def interface_ips():
+    """IPv4 address of every interface, except loopback."""
+    allips = []
+    for i in netifaces.interfaces():
+        try:
+            addr = netifaces.ifaddresses(i)[netifaces.AF_INET][0]["addr"]
+            if not addr.startswith("127."):
+                allips.append(addr)
+        except (KeyError, IndexError):
+            pass
+    return allips
 
-        while CONTEXT["scanning_robots"]:
-            try:
-                # Get all interface IPs
-                interfaces = netifaces.interfaces()
-                allips = []
-                for i in interfaces:
-                    try:
-                        addr = netifaces.ifaddresses(i)[netifaces.AF_INET][0]["addr"]
-                        if not addr.startswith("127."):
-                            allips.append(addr)
-                    except:
-                        pass
 
-                msg = b'ruarobot'
+def parse_reply(data, address):
+    """'iamarobot;model;name;port' -> robot dict, or None for anything else."""
+    if not data.startswith(b"iamarobot"):
+        return None
+    try:
+        _, robot_model, robot_name, server_port = data.decode("utf-8").strip().split(";")
+        port = int(server_port)
+    except ValueError:
+        return None
+    return {
+        "name": robot_name,
+        "model": robot_model,
+        "ip": address[0],
+        "port": port,
+        "address": "http://%s:%s" % (address[0], port),
+    }
+
+
+def discover_robots(timeout=3.0, models=None, attempts=3, on_found=None, stop_event=None, ips=None,
+                    expected=None):
+    """
+    Broadcasts 'ruarobot' on every interface at once and collects the
+    'iamarobot' replies as they arrive, until the timeout (total, for all
+    interfaces together) runs out.
+
+    timeout: total seconds to listen.
+    models: only report robots of these models (all models if empty).
+    attempts: the broadcast is repeated this many times, spread over the
+        timeout, in case a packet is lost.
+    on_found: called with each new robot dict as soon as it answers.
+    stop_event: a threading.Event that ends the scan early when set.
+    ips: interface addresses to scan (defaults to all of them).
+    expected: return as soon as this many robots have answered.
+
+    Returns the list of robot dicts (name, model, ip, port, address).
+    """
+    sel = selectors.DefaultSelector()
+    socks = []
+    for ip in (interface_ips() if ips is None else ips):
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.setblocking(False)
+            sock.bind((ip, 0))
+            sel.register(sock, selectors.EVENT_READ)
+            socks.append(sock)
+        except OSError as e:
+            print(f"Interface error ({ip}): {e}")
+
+    found = {}
+    start = time.monotonic()
+    deadline = start + timeout
+    resend_interval = timeout / max(1, attempts)
+    next_send = start
+    sent = 0
 
-                # Scan each interface
-                for ip in allips:
+    try:
+        while socks:
+            now = time.monotonic()
+            if now >= deadline or (stop_event is not None and stop_event.is_set()):
+                break
+
+            if sent < attempts and now >= next_send:
+                for sock in socks:
                     try:
-                        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-                        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-                        # Timeout is short so we can loop and retry sending
-                        sock.settimeout(0.5)
-                        sock.bind((ip, 0))
-
-                        # 2. SEND MULTIPLE TIMES: Send the broadcast 3 times per interface
-                        #    This accounts for packet loss or collisions on WiFi
-                        for _ in range(3):
-                            sock.sendto(msg, ("255.255.255.255", 5000))
-
-                            # Listen for responses after each send
-                            start_time = time.time()
-                            while time.time() - start_time < 1.0:  # Listen for 1 second window
-                                try:
-                                    data, address = sock.recvfrom(1024)
-
-                                    if b"iamarobot" in data:
-                                        _, robot_model, robot_name, server_port = data.decode("utf-8").split(";")
-
-                                        # 3. FILTER DUPLICATES: Only callback if we haven't seen this IP yet
-                                        if address[0] not in found_ips:
-                                            found_ips.add(address[0])
-
-                                            # Filter by model if requested
-                                            if CONTEXT["robot_model"]:
-                                                if robot_model == CONTEXT["robot_model"]:
-                                                    cb(robot_name, "http://%s:%s" % (address[0], server_port))
-                                            else:
-                                                cb(robot_name, "http://%s:%s" % (address[0], server_port))
-
-                                except socket.timeout:
-                                    # No packet received in this short window, continue loop
-                                    pass
-                                except Exception as e:
-                                    print(f"Socket error: {e}")
-                                    break
-
-                        sock.close()
-                    except Exception as e:
-                        print(f"Interface error: {e}")
-                        pass
-
-                # Optional: slight sleep before rescanning interfaces to save CPU
-                time.sleep(1)
+                        sock.sendto(DISCOVERY_MESSAGE, ("255.255.255.255", DISCOVERY_PORT))
+                    except OSError as e:
+                        print(f"Send error: {e}")
+                sent += 1
+                next_send = start + sent * resend_interval
+
+            wake = deadline if sent >= attempts else min(deadline, next_send)
+            # Short cap so a stop_event is noticed quickly
+            for key, _ in sel.select(timeout=min(max(0.0, wake - time.monotonic()), 0.1)):
+                try:
+                    data, address = key.fileobj.recvfrom(1024)
+                except OSError:
+                    continue
+
+                robot = parse_reply(data, address)
+                if robot is None or robot["ip"] in found:
+                    continue
+                if models and robot["model"] not in models:
+                    continue
+
+                found[robot["ip"]] = robot
+                if on_found is not None:
+                    on_found(robot)
+
+            if expected is not None and len(found) >= expected:
+                break
+    finally:
+        for sock in socks:
+            sel.unregister(sock)
+            sock.close()
+        sel.close()
+
+    return list(found.values())
+
+
+class DiscoveryService:
+    """
+    Keeps scanning in the background until stop() is called, reporting each
+    robot once. Replaces the old global CONTEXT flag.
+    """
+
+    def __init__(self, cb=callback, models=None, sweep_timeout=3.0, pause=1.0):
+        self.cb = cb
+        self.models = models
+        self.sweep_timeout = sweep_timeout
+        self.pause = pause
+        self.robots = {}
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
 
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.sweep_timeout + 1.0)
+            self._thread = None
+
+    def _on_found(self, robot):
+        if robot["ip"] not in self.robots:
+            self.robots[robot["ip"]] = robot
+            self.cb(robot["name"], robot["address"])
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                discover_robots(self.sweep_timeout, models=self.models,
+                                on_found=self._on_found, stop_event=self._stop)
             except Exception as e:
                 print(f"Scan error: {e}")
-                pass
+            self._stop.wait(self.pause)
+
+
+# ---------- discovery cache ----------
+
+def load_cached_robots(cache_path=CACHE_FILE):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def save_cached_robots(robots, cache_path=CACHE_FILE):
+    try:
+        with open(cache_path, "w") as f:
+            json.dump(robots, f, indent=2)
+    except OSError as e:
+        print(f"Could not write robot cache {cache_path}: {e}")
+
+
+def probe_robot(robot, timeout=0.5):
+    """True if the robot answers GET /status within the timeout."""
+    try:
+        response = requests.get(f"{robot['address']}/status", timeout=timeout)
+        return response.ok
+    except requests.exceptions.RequestException:
+        return False
+
 
-    CONTEXT["scanning_robots"] = True
-    t = threading.Thread(target=scan_robots_runnable)
-    t.start()
+def find_robots(timeout=3.0, models=None, cache_path=CACHE_FILE, probe_timeout=0.5, expected=None, name=None):
+    """
+    Cache first: every robot from the cache file is probed with a quick
+    status request (all in parallel). Only if none of them answers (or
+    fewer than expected, or not the one called name) is a broadcast scan
+    done. The cache is then updated with what was found.
+
+    Returns the list of robot dicts (name, model, ip, port, address).
+    """
+    cached = [robot for robot in load_cached_robots(cache_path)
+              if not models or robot.get("model") in models]
+
+    alive = []
+    if cached:
+        with ThreadPoolExecutor(max_workers=len(cached)) as pool:
+            results = pool.map(lambda robot: probe_robot(robot, probe_timeout), cached)
+        alive = [robot for robot, ok in zip(cached, results) if ok]
+
+    named = name is None or any(robot["name"] == name for robot in alive)
+    if alive and named and (expected is None or len(alive) >= expected):
+        robots = alive
+    else:
+        # Looking for one robot by name: stop listening once it has answered
+        stop_event = threading.Event() if name is not None else None
+        on_found = None
+        if name is not None:
+            def on_found(robot):
+                if robot["name"] == name:
+                    stop_event.set()
+        robots = discover_robots(timeout, models=models, expected=expected, on_found=on_found,
+                                 stop_event=stop_event)
+        # Keep cached robots that still answer but missed the broadcast
+        known = {robot["ip"] for robot in robots}
+        robots += [robot for robot in alive if robot["ip"] not in known]
+
+    now = time.time()
+    for robot in robots:
+        robot["last_seen"] = now
+    if robots:
+        # Merge, so robots that are just switched off stay in the cache
+        merged = {robot["ip"]: robot for robot in load_cached_robots(cache_path)}
+        merged.update({robot["ip"]: robot for robot in robots})
+        save_cached_robots(list(merged.values()), cache_path)
+
+    return robots
+
+
+def find_robot_ip(name=None, default=None, **kwargs):
+    """IP of the robot with this name (or of the first robot found), else default."""
+    for robot in find_robots(expected=None if name else 1, name=name, **kwargs):
+        if name is None or robot["name"] == name:
+            return robot["ip"]
+    return default
+
+
+def scan_robots(cb, models=[]):
+    """Starts a background scan and returns the DiscoveryService (call .stop() to end it)."""
+    return DiscoveryService(cb, models=models).start()
 
 
-# Start the scan
-scan_robots(callback)
\ No newline at end of file
+if __name__ == "__main__":
+    robots = find_robots(timeout=3.0)
+    for robot in robots:
+        callback(robot["name"], robot["address"])
+    if not robots:
+        print("No robots found.")
@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ElmoV2API import ElmoV2API
+from find_elmo_ip import find_robots
+from test import ElmoEmotionManager
+
+# Latencies kept per (robot, op) for the stats
+LATENCY_WINDOW = 1000
+
+
+class Fleet:
+    """
+    Drives several Elmos at once. Every robot has its own pooled ElmoV2API,
+    and a command sent to the fleet runs on all targeted robots concurrently,
+    so the total time is that of the slowest robot rather than the sum.
+
+        fleet = Fleet.from_discovery()
+        fleet.set_screen(image="happy.gif")                  # every robot
+        fleet.play_sound("hmm.wav", targets=["elmo-1"])      # just one
+        fleet.set_emotion("sad")
+        print(fleet.stats())
+
+    Any robot op in OPS can be called on the fleet; it returns a dict of
+    robot name -> result: the op's own result (True for a command the robot
+    took, the status dict...), False (None for status) if the robot refused or
+    didn't answer, None if the call raised. Both count as errors in stats(). Robots that
+    advertise the same name are told apart as name@ip (or name@ip:port).
+    """
+
+    # ElmoV2API methods that talk to the robot and can be fanned out
+    OPS = frozenset({
+        "status", "post_command", "enable_behavior", "set_pan_torque", "set_tilt_torque",
+        "set_pan", "set_tilt", "set_head", "play_sound", "play_audio", "set_volume",
+        "start_recording", "stop_recording", "set_screen", "update_leds", "update_leds_delta",
+        "update_leds_raw", "update_leds_icon", "start_video_recording", "stop_video_recording",
+        "reboot", "shutdown",
+    })
+
+    def __init__(self, robots, **api_kwargs):
+        """
+        robots: robot dicts as returned by find_robots / discover_robots, or
+            plain IP strings.
+        api_kwargs: passed to every ElmoV2API (pool_size, timeouts...).
+        """
+        robots = [{"name": robot, "ip": robot} if isinstance(robot, str) else robot for robot in robots]
+        self.apis = {}
+        for key, robot in zip(_unique_names(robots), robots):
+            self.apis[key] = ElmoV2API(robot["ip"], port=robot.get("port"), **api_kwargs)
+
+        self.emotion_managers = {}
+        self._manager_locks = {name: threading.Lock() for name in self.apis}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.apis)))
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._errors = defaultdict(int)
+
+    @classmethod
+    def from_discovery(cls, timeout=3.0, models=None, **api_kwargs):
+        return cls(find_robots(timeout=timeout, models=models), **api_kwargs)
+
+    def names(self):
+        return list(self.apis)
+
+    def __len__(self):
+        return len(self.apis)
+
+    # ---------- fan-out ----------
+
+    def call(self, op, *args, targets=None, **kwargs):
+        """Runs api.<op>(*args, **kwargs) on every target robot at the same time."""
+        names = self._targets(targets)
+        futures = {name: self._pool.submit(self._timed, name, op, *args, **kwargs) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+    def __getattr__(self, op):
+        if op not in self.OPS:
+            raise AttributeError(op)
+
+        def fan_out(*args, targets=None, **kwargs):
+            return self.call(op, *args, targets=targets, **kwargs)
+        return fan_out
+
+    def set_emotion(self, emotion, targets=None):
+        """Emotion (face + head motion) per robot; the motion controllers start on first use."""
+        names = self._targets(targets)
+        futures = {
+            name: self._pool.submit(self._timed_call, name, "set_emotion", self._set_emotion, name, emotion)
+            for name in names
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    def _set_emotion(self, name, emotion):
+        # Runs in the pool: building a manager takes a few round trips to its robot
+        with self._manager_locks[name]:
+            manager = self.emotion_managers.get(name)
+            if manager is None:
+                manager = self.emotion_managers[name] = ElmoEmotionManager(self.apis[name])
+        return manager.set_emotion(emotion)
+
+    def _targets(self, targets):
+        if targets is None:
+            return list(self.apis)
+        if isinstance(targets, str):
+            targets = [targets]
+        unknown = [name for name in targets if name not in self.apis]
+        if unknown:
+            raise KeyError(f"Unknown robots: {unknown}")
+        return list(targets)
+
+    def _timed(self, name, op, *args, **kwargs):
+        return self._timed_call(name, op, getattr(self.apis[name], op), *args, **kwargs)
+
+    def _timed_call(self, name, op, function, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            print(f"[FLEET] {name}: {op} failed: {e}", flush=True)
+            with self._lock:
+                self._errors[(name, op)] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            # Commands return False when the robot didn't take them, status() None
+            if result is False or (op == "status" and result is None):
+                self._errors[(name, op)] += 1
+            else:
+                self._latencies[(name, op)].append(elapsed)
+        return result
+
+    # ---------- stats ----------
+
+    def stats(self):
+        """
+        Latency per op (all robots together) and per robot, in milliseconds:
+        {"ops": {op: {...}}, "robots": {name: {...}}} with count, errors,
+        mean, p50, p95 and max.
+        """
+        with self._lock:
+            latencies = {key: list(values) for key, values in self._latencies.items()}
+            errors = dict(self._errors)
+
+        by_op = defaultdict(list)
+        by_robot = defaultdict(list)
+        for (name, op), values in latencies.items():
+            by_op[op] += values
+            by_robot[name] += values
+        errors_by_op = defaultdict(int)
+        errors_by_robot = defaultdict(int)
+        for (name, op), count in errors.items():
+            errors_by_op[op] += count
+            errors_by_robot[name] += count
+
+        return {
+            "ops": {op: _summary(by_op[op], errors_by_op[op]) for op in set(by_op) | set(errors_by_op)},
+            "robots": {name: _summary(by_robot[name], errors_by_robot[name]) for name in self.apis},
+        }
+
+    def close(self):
+        for manager in self.emotion_managers.values():
+            manager.stop()
+        self._pool.shutdown(wait=True)
+        for api in self.apis.values():
+            api.close()
+
+
+def _unique_names(robots):
+    """Robot names, with name@ip (then name@ip:port) for names that more than one robot uses."""
+    names = [robot["name"] for robot in robots]
+    keys = [name if names.count(name) == 1 else f"{name}@{robot['ip']}" for name, robot in zip(names, robots)]
+    return [key if keys.count(key) == 1 else f"{key}:{robot.get('port') or ElmoV2API.PORT}"
+            for key, robot in zip(keys, robots)]
+
+
+def _summary(values, errors):
+    values = sorted(values)
+    if not values:
+        return {"count": 0, "errors": errors}
+
+    def percentile(p):
+        return values[min(len(values) - 1, int(p / 100.0 * len(values)))] * 1000
+
+    return {
+        "count": len(values),
+        "errors": errors,
+        "mean": sum(values) / len(values) * 1000,
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "max": values[-1] * 1000,
+    }
@@ -0,0 +1,150 @@
+import os
+import re
+import threading
+import time
+
+from PIL import Image, ImageSequence
+
+from ElmoV2API import ElmoV2API
+from led_frames import LedFrameCompiler
+from scheduler import default_scheduler
+
+DEFAULT_FRAME_DELAY = 0.04  # 25 fps
+FRAME_DELAY_PATTERN = re.compile(r"delay-([0-9.]+)s")
+
+
+def parse_frame_delay(filename, default=DEFAULT_FRAME_DELAY):
+    """'frame_000_delay-0.04s.png' -> 0.04"""
+    match = FRAME_DELAY_PATTERN.search(os.path.basename(filename))
+    return float(match.group(1)) if match else default
+
+
+def gif_frame_delays(gif_path, default=DEFAULT_FRAME_DELAY):
+    """Per-frame delays of an animated GIF, in seconds."""
+    with Image.open(gif_path) as img:
+        return [
+            frame.info.get("duration", default * 1000) / 1000.0 or default
+            for frame in ImageSequence.Iterator(img)
+        ]
+
+
+class LedAnimationPlayer:
+    """
+    Plays frame animations on the 13x13 LED matrix in the background, as
+    calls on the shared Scheduler.
+
+    Frames are scheduled against a monotonic clock: frame i is due at
+    start + sum(delays[:i]). If sending a frame takes longer than its slot,
+    the frames whose slot has already passed are skipped, so the animation
+    keeps its real duration instead of drifting.
+    """
+
+    def __init__(self, api: ElmoV2API, compiler: LedFrameCompiler = None, scheduler=None):
+        self.api = api
+        self.compiler = compiler or LedFrameCompiler()
+        self.scheduler = scheduler or default_scheduler()
+
+        self.payloads = []
+        self.delays = []
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.send_errors = 0
+        self._failing = False
+
+        self._done = threading.Event()
+        self._done.set()
+        # Bumped by stop(), so a frame that is being sent right now doesn't schedule the next one
+        self._generation = 0
+
+    # ---------- loading ----------
+
+    def load_dir(self, directory):
+        """Loads frames named like 'frame_000_delay-0.04s.png' from a directory."""
+        files = self.compiler.list_frames(directory)
+        frames = self.compiler.compile_dir(directory)
+        if len(frames) != len(files):
+            # Some files were skipped: match the delays to the frames that compiled
+            compiled = [(name, self.compiler.compile_file(name)) for name in files]
+            files = [name for name, frame in compiled if frame is not None]
+            frames = [frame for name, frame in compiled if frame is not None]
+        self.payloads = self.compiler.payloads(frames)
+        self.delays = [parse_frame_delay(name) for name in files]
+
+    def load_gif(self, gif_path):
+        frames = self.compiler.compile_gif(gif_path)
+        self.payloads = self.compiler.payloads(frames)
+        self.delays = gif_frame_delays(gif_path)
+
+    # ---------- playback ----------
+
+    def play(self, loop=False):
+        """Starts playing in the background. Any running animation is stopped first."""
+        self.stop()
+        if not self.payloads:
+            print("[LEDS] Nothing to play, load frames first.", flush=True)
+            return
+
+        # Start time of every frame, relative to the start of the animation
+        offsets = [0.0]
+        for delay in self.delays[:-1]:
+            offsets.append(offsets[-1] + delay)
+        total = offsets[-1] + self.delays[-1]
+
+        self._done.clear()
+        self.scheduler.call_soon(self._frame, 0, time.monotonic(), offsets, total, loop, self._generation,
+                                 channel=self)
+
+    def stop(self):
+        self._generation += 1
+        self.scheduler.cancel_channel(self)
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Blocks until a non-looping animation has finished. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def is_playing(self):
+        return not self._done.is_set()
+
+    def _frame(self, index, start, offsets, total, loop, generation):
+        if generation != self._generation:
+            return
+        try:
+            self._send_frame(index, start, offsets, total, loop, generation)
+        except Exception:
+            # Nothing comes after this frame now: don't leave wait() hanging
+            self._done.set()
+            raise
+
+    def _send_frame(self, index, start, offsets, total, loop, generation):
+        if index >= len(self.payloads):
+            if not loop:
+                self._done.set()
+                return
+            start += total
+            index = 0
+
+        # A failed frame (timeout, dropped link) is skipped, the animation goes on
+        try:
+            self.api.update_leds(self.payloads[index])
+            self.frames_sent += 1
+            self._failing = False
+        except Exception as e:
+            self.send_errors += 1
+            if not self._failing:  # once per outage, not at every frame
+                print(f"[LEDS] Could not send frame {index}: {e}", flush=True)
+            self._failing = True
+
+        # Jump to the frame that is due now, skipping the ones we are late for
+        elapsed = time.monotonic() - start
+        next_index = index + 1
+        while next_index < len(offsets) and offsets[next_index] + self.delays[next_index] <= elapsed:
+            next_index += 1
+            self.frames_skipped += 1
+
+        if next_index < len(offsets):
+            due = start + offsets[next_index]
+        else:
+            due = start + total
+        self.scheduler.call_at(due, self._frame, next_index, start, offsets, total, loop, generation,
+                               channel=self)
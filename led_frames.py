@@ -0,0 +1,254 @@
+import hashlib
+import os
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageSequence, ImageStat
+
+LED_GRID_SIZE = 13
+DEFAULT_CACHE_DIR = ".led_cache"
+
+
+def image_to_rgb_array(image_path, contrast=2.0, color=1.5, brightness=0.8):
+    """
+    contrast: 1.0 is original. >1.0 makes darks darker and lights lighter.
+    color: 1.0 is original. >1.0 makes colors more vibrant (saturation).
+    brightness: 1.0 is original. <1.0 makes the whole image darker.
+    """
+    try:
+        with Image.open(image_path) as img:
+            return pil_to_rgb_array(img, contrast=contrast, color=color, brightness=brightness)
+
+    except FileNotFoundError:
+        print(f"Error: The file '{image_path}' was not found.")
+        return None
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return None
+
+
+def pil_to_rgb_array(img, contrast=2.0, color=1.5, brightness=0.8):
+    """Same as image_to_rgb_array, for an image that is already open (e.g. a GIF frame)."""
+    # 1. Convert to RGB
+    img = img.convert('RGB')
+
+    # 2. ENHANCE IMAGE (Fixing the "Very Light" issue)
+    # Adjust Contrast
+    enhancer = ImageEnhance.Contrast(img)
+    img = enhancer.enhance(contrast)
+
+    # Adjust Color (Saturation)
+    enhancer = ImageEnhance.Color(img)
+    img = enhancer.enhance(color)
+
+    # Adjust Brightness (Optional: prevents "washed out" look)
+    enhancer = ImageEnhance.Brightness(img)
+    img = enhancer.enhance(brightness)
+
+    # 3. Resize to 13x13
+    # Using LANCZOS is high quality, but if you want a "blocky" look,
+    # change Resampling.LANCZOS to Resampling.NEAREST
+    img_resized = img.resize((LED_GRID_SIZE, LED_GRID_SIZE), resample=Image.Resampling.LANCZOS)
+
+    # 4. Convert to NumPy array
+    rgb_array = np.array(img_resized)
+
+    # 5. Clean up low values (Optional "Gamma" fix)
+    # This forces weak pixels (like dark grey noise) to become pure black (0)
+    # Any pixel value less than 30 becomes 0
+    rgb_array[rgb_array < 30] = 0
+
+    return rgb_array
+
+
+def enhance_palette(img, contrast=2.0, color=1.5, brightness=0.8):
+    """
+    The contrast -> color -> brightness chain of pil_to_rgb_array, run on
+    the palette of a "P" image instead of on every pixel. Each step works on
+    one pixel at a time (only contrast needs the mean grey level, which
+    comes from the palette histogram), so the result is byte for byte what
+    the full-size chain gives, for 256 colors instead of every pixel.
+    Returns an RGB image.
+    """
+    palette = img.getpalette("RGB")
+    palette = Image.frombytes("RGB", (256, 1), bytes(palette + [0] * (768 - len(palette))))
+
+    # Same mean as ImageEnhance.Contrast: the grey level histogram of the whole image
+    grey = np.asarray(palette.convert("L")).ravel()
+    histogram = np.bincount(grey, weights=img.histogram(), minlength=256).astype(np.int64).tolist()
+    mean = int(ImageStat.Stat(histogram).mean[0] + 0.5)
+    palette = Image.blend(Image.new("L", palette.size, mean).convert("RGB"), palette, contrast)
+
+    palette = ImageEnhance.Color(palette).enhance(color)
+    palette = ImageEnhance.Brightness(palette).enhance(brightness)
+
+    img = img.copy()
+    img.putpalette(palette.tobytes())
+    return img.convert("RGB")
+
+
+def fast_image_to_rgb_array(image_paths, contrast=2.0, color=1.5, brightness=0.8):
+    """
+    Same output as image_to_rgb_array, about twice as fast for palette
+    images (GIF frames, the PNGs in Emotions/led_grid): the enhancement is
+    done on the palette (see enhance_palette). Other images go through the
+    PIL chain.
+
+    image_paths: one path -> (13,13,3) array, or a list of paths -> (N,13,13,3).
+    """
+    single = isinstance(image_paths, (str, os.PathLike))
+    paths = [image_paths] if single else list(image_paths)
+
+    frames = np.empty((len(paths), LED_GRID_SIZE, LED_GRID_SIZE, 3), dtype=np.uint8)
+    for i, path in enumerate(paths):
+        with Image.open(path) as img:
+            if img.mode != "P":
+                frames[i] = pil_to_rgb_array(img, contrast=contrast, color=color, brightness=brightness)
+                continue
+            img = enhance_palette(img, contrast=contrast, color=color, brightness=brightness)
+        rgb_array = np.array(img.resize((LED_GRID_SIZE, LED_GRID_SIZE), resample=Image.Resampling.LANCZOS))
+        rgb_array[rgb_array < 30] = 0
+        frames[i] = rgb_array
+    return frames[0] if single else frames
+
+
+def to_led_payload(frame):
+    """(13,13,3) uint8 frame -> the 169 [r, g, b] lists expected by update_leds."""
+    return frame.reshape(-1, 3).tolist()
+
+
+class LedFrameCompiler:
+    """
+    Turns images (or whole directories of frames) into uint8 (N,13,13,3)
+    arrays once, and caches the result in memory and on disk.
+
+    Cache entries are keyed by the file contents and the enhancement
+    parameters, so editing a frame or changing contrast/color/brightness
+    recompiles it, and anything else is a cache hit.
+
+    fast=True uses fast_image_to_rgb_array (same frames, enhanced on the
+    palette); fast=False uses the original PIL chain on every file.
+    """
+
+    IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp")
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, contrast=2.5, color=1.5, brightness=0.9, fast=True):
+        self.cache_dir = cache_dir
+        self.fast = fast
+        self.params = {"contrast": contrast, "color": color, "brightness": brightness}
+        self._memory = {}
+        # (path, mtime, size) -> content hash, so unchanged files are not re-read
+        self._hashes = {}
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def compile_file(self, image_path, **params):
+        """Returns one (13,13,3) uint8 frame, or None if the image can't be read."""
+        params = {**self.params, **params}
+        try:
+            key = self._cache_key(self._file_hash(image_path), params)
+        except FileNotFoundError:
+            print(f"Error: The file '{image_path}' was not found.")
+            return None
+        except OSError as e:
+            print(f"Error: Could not read '{image_path}': {e}")
+            return None
+
+        frame = self._load(key)
+        if frame is None:
+            if self.fast:
+                try:
+                    frame = fast_image_to_rgb_array(image_path, **params)
+                except Exception as e:
+                    print(f"Error: Could not compile '{image_path}': {e}")
+                    return None
+            else:
+                frame = image_to_rgb_array(image_path, **params)
+            if frame is None:
+                return None
+            frame = frame.astype(np.uint8)
+            self._store(key, frame)
+        return frame
+
+    def compile_dir(self, directory, **params):
+        """
+        Compiles every image in the directory (sorted by name) into one
+        (N,13,13,3) array. Files that can't be read are reported and skipped.
+        """
+        params = {**self.params, **params}
+        files, hashes = [], []
+        for path in self.list_frames(directory):
+            try:
+                hashes.append(self._file_hash(path))
+                files.append(path)
+            except OSError as e:
+                print(f"Error: Could not read '{path}', skipped: {e}")
+        key = self._cache_key("".join(hashes), params)
+
+        frames = self._load(key)
+        if frames is None and self.fast and files:
+            try:
+                frames = fast_image_to_rgb_array(files, **params)
+                self._store(key, frames)
+            except Exception:
+                pass  # a bad image: compiled one by one below, which skips it
+        if frames is None:
+            compiled = [self.compile_file(path, **params) for path in files]
+            compiled = [frame for frame in compiled if frame is not None]
+            frames = np.stack(compiled) if compiled else np.zeros((0, LED_GRID_SIZE, LED_GRID_SIZE, 3), np.uint8)
+            self._store(key, frames)
+        return frames
+
+    def compile_gif(self, gif_path, **params):
+        """Compiles every frame of an animated GIF into one (N,13,13,3) array."""
+        params = {**self.params, **params}
+        key = self._cache_key(self._file_hash(gif_path) + "gif", params)
+
+        frames = self._load(key)
+        if frames is None:
+            with Image.open(gif_path) as img:
+                compiled = [pil_to_rgb_array(frame, **params) for frame in ImageSequence.Iterator(img)]
+            frames = np.stack(compiled).astype(np.uint8)
+            self._store(key, frames)
+        return frames
+
+    def payloads(self, frames):
+        """Ready-to-send update_leds arguments for a (N,13,13,3) array."""
+        return [to_led_payload(frame) for frame in frames]
+
+    def list_frames(self, directory):
+        return [
+            os.path.join(directory, name)
+            for name in sorted(os.listdir(directory))
+            if name.lower().endswith(self.IMAGE_EXTENSIONS)
+        ]
+
+    # ---------- cache ----------
+
+    def _file_hash(self, path):
+        stat = os.stat(path)
+        stamp = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        digest = self._hashes.get(stamp)
+        if digest is None:
+            with open(path, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            self._hashes[stamp] = digest
+        return digest
+
+    def _cache_key(self, content_hash, params):
+        text = content_hash + repr(sorted(params.items())) + ("fast" if self.fast else "pil")
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _load(self, key):
+        frames = self._memory.get(key)
+        if frames is None and self.cache_dir:
+            path = os.path.join(self.cache_dir, key + ".npy")
+            if os.path.exists(path):
+                frames = np.load(path)
+                self._memory[key] = frames
+        return frames
+
+    def _store(self, key, frames):
+        self._memory[key] = frames
+        if self.cache_dir:
+            np.save(os.path.join(self.cache_dir, key + ".npy"), frames)
@@ -0,0 +1,125 @@
+import base64
+
+import numpy as np
+
+from ElmoV2API import ElmoV2API
+from command_queue import CommandQueue
+
+LED_COUNT = 13 * 13
+
+
+def json_size(values):
+    """
+    len(json.dumps(values.tolist())) for a 1-D or 2-D array of ints in
+    0-999 (LED colors, LED indices), counted without encoding anything.
+    """
+    values = np.asarray(values)
+    if values.size == 0:
+        return 2
+    size = int(np.count_nonzero(values >= 10) + np.count_nonzero(values >= 100)) + values.size
+    n = len(values)
+    if values.ndim == 2:
+        size += n * 2 * values.shape[1]  # "[" + "]" and ", " between the items of each row
+    return size + 2 + 2 * (n - 1)
+
+
+class LedStateTracker:
+    """
+    Remembers the last LED frame the robot acknowledged and only sends what
+    changed.
+
+    With the stock robot server only update_leds exists, so an unchanged
+    frame is skipped and anything else is sent in full. With delta_ops=True
+    (robot-side handlers for update_leds_delta and update_leds_raw), each
+    frame goes out as whichever is smallest on the wire:
+      - update_leds_delta: only the changed indices and their colors
+      - update_leds_raw: the whole frame as 507 base64-encoded bytes
+    After a failed send the next frame is always sent in full.
+
+    Has the same update_leds(colors) signature as ElmoV2API, so it can be
+    handed to LedAnimationPlayer in place of the api.
+
+    api can also be a CommandQueue, so frames sent from the Scheduler
+    don't wait for the robot. A queued frame is taken as acknowledged and
+    the queue reports failed sends back (the next frame then goes in full).
+    Delta ops are turned off behind a queue: a superseded frame is dropped
+    without being sent, and the next delta would build on it.
+    """
+
+    def __init__(self, api: ElmoV2API, delta_ops=False):
+        self.api = api
+        self._queued = isinstance(api, CommandQueue)
+        if delta_ops and self._queued:
+            print("[LEDS] delta_ops need an ElmoV2API, not a CommandQueue; sending full frames", flush=True)
+            delta_ops = False
+        self.delta_ops = delta_ops
+        self._last = None
+
+        self.stats = {"full": 0, "delta": 0, "raw": 0, "unchanged": 0, "bytes": 0}
+
+    def update_leds(self, colors):
+        frame = np.asarray(colors, dtype=np.uint8).reshape(LED_COUNT, 3)
+
+        if self._last is None:
+            changed = np.arange(LED_COUNT)
+        else:
+            changed = np.flatnonzero((frame != self._last).any(axis=1))
+            if len(changed) == 0:
+                self.stats["unchanged"] += 1
+                return
+
+        kind, command, size = self._encode(frame, changed)
+
+        if self._queued:
+            self._last = frame
+            self.api.post_command(command, on_sent=self._on_sent)
+            self.stats[kind] += 1
+            self.stats["bytes"] += size
+            return
+
+        # post_command returns False (or raises) when the robot did not take it
+        try:
+            ok = self.api.post_command(command)
+        except Exception:
+            self._last = None
+            raise
+
+        if ok is False:
+            self._last = None
+            return
+
+        self._last = frame
+        self.stats[kind] += 1
+        self.stats["bytes"] += size
+
+    def _on_sent(self, ok):
+        # Called from the queue's sender thread
+        if not ok:
+            self._last = None
+
+    def reset(self):
+        """Forgets the robot state, e.g. after something else drew on the LEDs."""
+        self._last = None
+
+    def _encode(self, frame, changed):
+        """Returns (kind, command, encoded size in bytes)."""
+        if not self.delta_ops:
+            command = {"op": "update_leds", "colors": frame.tolist()}
+            return "full", command, len('{"op": "update_leds", "colors": }') + json_size(frame)
+
+        raw = {"op": "update_leds_raw", "data": base64.b64encode(frame.tobytes()).decode("ascii")}
+        raw_size = len(raw["data"]) + len('{"op": "update_leds_raw", "data": ""}')
+        if self._last is None:
+            return "raw", raw, raw_size
+
+        # Sizes are counted, not encoded: requests does the only json.dumps
+        delta_size = (len('{"op": "update_leds_delta", "indices": , "colors": }')
+                      + json_size(changed) + json_size(frame[changed]))
+        if delta_size < raw_size:
+            delta = {
+                "op": "update_leds_delta",
+                "indices": changed.tolist(),
+                "colors": frame[changed].tolist(),
+            }
+            return "delta", delta, delta_size
+        return "raw", raw, raw_size
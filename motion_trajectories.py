@@ -0,0 +1,223 @@
+import math
+import random
+import time
+
+import numpy as np
+
+# Setpoints per second in a compiled trajectory
+DEFAULT_RATE_HZ = 20.0
+
+
+# ---------- easing ----------
+# t in [0, 1] (NumPy array) -> progress in [0, 1]
+
+def linear(t):
+    return t
+
+
+def ease_in_out(t):
+    return 0.5 - 0.5 * np.cos(np.pi * t)
+
+
+def ease_out(t):
+    return 1.0 - (1.0 - t) ** 2
+
+
+def ease_in(t):
+    return t ** 2
+
+
+EASINGS = {
+    "linear": linear,
+    "ease_in_out": ease_in_out,
+    "ease_out": ease_out,
+    "ease_in": ease_in,
+}
+
+
+# ---------- emotion patterns ----------
+# One loop of each emotion, as keyframes:
+#   {"pan": p, "tilt": t, "duration": d, "easing": e}  move there in d seconds
+#       (pan/tilt may be left out to keep the current value; duration is
+#       scaled by the emotion's duration_factor)
+#   {"hold": d}   stay still for d seconds
+#   {"pause": d}  stay still, scaled by the emotion's pause_factor
+# Any number can be a (low, high) range, drawn anew on every loop.
+
+EMOTION_PATTERNS = {
+    "neutral": [
+        {"pan": 0.0, "tilt": -2.0, "duration": 0.8},
+        {"pan": (-3.0, 3.0), "tilt": (-3.0, -1.0), "duration": 0.5},  # jitter
+        {"pause": (1.0, 2.0)},
+    ],
+    "happy": [
+        {"pan": 0.0, "tilt": -20.0, "duration": 0.6},  # slightly up
+        # sweep
+        {"pan": -35.0, "duration": 0.1},
+        {"hold": 1.0},
+        {"pan": 35.0, "duration": 0.1},
+        {"hold": 1.0},
+        {"pan": 0.0, "duration": 0.4},
+        {"pause": (0.5, 1.5)},
+    ],
+    "fear": [
+        {"pan": 0.0, "tilt": -50.0, "duration": 0.6},
+        {"pause": (0.5, 1.5)},
+    ],
+    "sad": [
+        {"pan": 0.0, "tilt": 15.0, "duration": 0.8},  # down
+        # droop + back (big nod)
+        {"tilt": 55.0, "duration": 1.5, "easing": "ease_out"},
+        {"hold": 0.3},
+        {"tilt": 15.0, "duration": 1.0},
+        {"pause": (1.5, 3.0)},
+    ],
+    "tired": [
+        {"pan": 0.0, "tilt": 15.0, "duration": 0.8},  # more drooped
+        # sway
+        {"pan": (-30.0, 30.0), "tilt": -15.0, "duration": 1.2},
+        {"hold": 1.0},
+        {"pan": 0.0, "tilt": 15.0, "duration": 1.2},
+        {"pause": (2.0, 4.0)},
+    ],
+}
+
+
+def _value(value):
+    if isinstance(value, (tuple, list)):
+        return random.uniform(*value)
+    return value
+
+
+class Trajectory:
+    """
+    Time-stamped head setpoints: times[i] seconds after the start, send
+    (pans[i], tilts[i]). duration also counts the holds at the end.
+    """
+
+    def __init__(self, times, pans, tilts, duration):
+        self.times = times
+        self.pans = pans
+        self.tilts = tilts
+        self.duration = duration
+
+    def __len__(self):
+        return len(self.times)
+
+
+def compile_trajectory(keyframes, start_pan=0.0, start_tilt=0.0, rate_hz=DEFAULT_RATE_HZ,
+                       duration_factor=1.0, pause_factor=1.0, pan_limits=None, tilt_limits=None):
+    """
+    Keyframes (see EMOTION_PATTERNS) -> Trajectory, starting from the
+    current head position. Each move becomes rate_hz setpoints per second
+    (at least one), interpolated with its easing and clamped to the limits.
+    """
+    times, pans, tilts = [], [], []
+    t0, pan, tilt = 0.0, float(start_pan), float(start_tilt)
+
+    for frame in keyframes:
+        if "hold" in frame or "pause" in frame:
+            hold = _value(frame["hold"]) if "hold" in frame else _value(frame["pause"]) * pause_factor
+            t0 += hold
+            continue
+
+        duration = _value(frame.get("duration", 0.0)) * duration_factor
+        target_pan = float(_value(frame.get("pan", pan)))
+        target_tilt = float(_value(frame.get("tilt", tilt)))
+        ease = EASINGS[frame.get("easing", "ease_in_out")]
+
+        n = max(1, int(math.ceil(duration * rate_hz)))
+        t = np.arange(1, n + 1, dtype=np.float64) / n
+        alpha = ease(t)
+        times.append(t0 + t * duration)
+        pans.append(pan + alpha * (target_pan - pan))
+        tilts.append(tilt + alpha * (target_tilt - tilt))
+
+        t0 += duration
+        pan, tilt = target_pan, target_tilt
+
+    if not times:
+        empty = np.zeros(0)
+        return Trajectory(empty, empty, empty, t0)
+
+    pans = np.concatenate(pans)
+    tilts = np.concatenate(tilts)
+    if pan_limits is not None:
+        pans = np.clip(pans, *pan_limits)
+    if tilt_limits is not None:
+        tilts = np.clip(tilts, *tilt_limits)
+    return Trajectory(np.concatenate(times), pans, tilts, t0)
+
+
+def play_trajectory(trajectory, send, wait, latency=0.0):
+    """
+    Sends the setpoints on time against the monotonic clock.
+
+    send(pan, tilt): called for each setpoint.
+    wait(seconds): sleeps; returning True aborts playback (e.g. emotion changed).
+    latency: estimated send time, setpoints go out this much early.
+
+    Setpoints that are already overdue when the next one is also due are
+    skipped, so a slow link never stretches the pattern. Returns
+    (completed, latency), with the latency estimate updated from the sends.
+    """
+    start = time.monotonic()
+    times, count = trajectory.times, len(trajectory)
+
+    for i in range(count):
+        now = time.monotonic()
+        if i + 1 < count and start + times[i + 1] - latency <= now:
+            continue  # late: the next setpoint is due already
+
+        delay = start + times[i] - latency - now
+        if delay > 0 and wait(delay):
+            return False, latency
+
+        sent = time.monotonic()
+        send(float(trajectory.pans[i]), float(trajectory.tilts[i]))
+        elapsed = time.monotonic() - sent
+        latency = elapsed if not latency else 0.8 * latency + 0.2 * elapsed
+
+    remaining = start + trajectory.duration - time.monotonic()
+    if remaining > 0 and wait(remaining):
+        return False, latency
+    return True, latency
+
+
+def schedule_trajectory(scheduler, trajectory, send, channel=None, latency=0.0, on_done=None, active=None):
+    """
+    Non-blocking play_trajectory: each setpoint is a call on the Scheduler,
+    with the same early sending and skipping of late setpoints.
+    on_done(latency) runs once the trajectory (holds included) is over.
+    Cancel with scheduler.cancel_channel(channel); active() returning False
+    also ends it (covers a step that was already running at cancel time).
+    """
+    start = time.monotonic()
+    times, count = trajectory.times, len(trajectory)
+    state = {"latency": latency}
+
+    def step(i):
+        if active is not None and not active():
+            return
+        now = time.monotonic()
+        while i + 1 < count and start + times[i + 1] - state["latency"] <= now:
+            i += 1  # late: the next setpoint is due already
+
+        sent = time.monotonic()
+        send(float(trajectory.pans[i]), float(trajectory.tilts[i]))
+        elapsed = time.monotonic() - sent
+        state["latency"] = elapsed if not state["latency"] else 0.8 * state["latency"] + 0.2 * elapsed
+
+        if i + 1 < count:
+            scheduler.call_at(start + times[i + 1] - state["latency"], step, i + 1, channel=channel)
+        elif on_done is not None:
+            scheduler.call_at(start + trajectory.duration, done, state["latency"], channel=channel)
+
+    def done(latency):
+        if active is None or active():
+            on_done(latency)
+
+    if count:
+        scheduler.call_at(start + times[0] - latency, step, 0, channel=channel)
+    elif on_done is not None:
+        scheduler.call_at(start + trajectory.duration, done, latency, channel=channel)
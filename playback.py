@@ -0,0 +1,167 @@
+import threading
+from collections import deque
+
+from scheduler import default_scheduler
+
+
+class Playback:
+    """
+    Handle for one queued cue, returned by CuePlayer.play().
+
+    state goes queued -> playing -> done, or to cancelled if cancel() is
+    called first. Callbacks added with add_done_callback run once the cue
+    ends either way, with the handle as argument.
+    """
+
+    def __init__(self, sound, duration, screen=None, on_done=None):
+        self.sound = sound
+        self.duration = duration
+        self.screen = screen
+        self.on_done = on_done
+        self.state = "queued"
+
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._on_cancel = None  # set by the CuePlayer
+
+    def cancel(self):
+        """Stops waiting for the clip (or skips it if it hasn't started). False if already over."""
+        if self._done.is_set():
+            return False
+        self._cancel.set()
+        if self._on_cancel is not None:
+            self._on_cancel(self)
+        return True
+
+    def cancelled(self):
+        return self.state == "cancelled"
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Blocks until the cue has ended. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, fn):
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, state):
+        with self._lock:
+            self.state = state
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"[PLAYBACK] Callback error: {e}", flush=True)
+
+
+class CuePlayer:
+    """
+    Plays screen + sound cues one after another in the background (as calls
+    on the shared Scheduler), so the caller (the operator console) never
+    waits for a clip to end.
+
+        handle = cues.play("Robotic/hmm.wav", 1.5, screen="circle.gif",
+                           on_done=lambda: set_face("neutral_machine"))
+        handle.add_done_callback(print)
+        cues.play("next.wav", 2.0)                  # queued after the first
+        cues.play("urgent.wav", 1.0, interrupt=True)  # cancels both, plays now
+
+    on_done runs on the scheduler thread when a clip has played to the end
+    (not when it was cancelled), before the next queued cue starts.
+    """
+
+    def __init__(self, api, scheduler=None):
+        """api: best a CommandQueue, so the sends don't block the scheduler thread."""
+        self.api = api
+        self.scheduler = scheduler or default_scheduler()
+
+        self._pending = deque()
+        self._current = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def play(self, sound, duration, screen=None, on_done=None, interrupt=False):
+        """
+        Queues a cue and returns its Playback handle right away.
+
+        duration: seconds until the cue counts as finished (the clip length).
+        screen: image shown when the cue starts.
+        interrupt: cancel the playing and queued cues first.
+        """
+        handle = Playback(sound, duration, screen=screen, on_done=on_done)
+        handle._on_cancel = self._cancelled
+        if interrupt:
+            self.stop_all()
+        with self._lock:
+            self._pending.append(handle)
+        self.scheduler.call_soon(self._start_next, channel=self)
+        return handle
+
+    def stop_all(self):
+        """Cancels the playing cue and everything queued. Returns the cancelled handles."""
+        with self._lock:
+            handles = ([self._current] if self._current is not None else []) + list(self._pending)
+        return [handle for handle in handles if handle.cancel()]
+
+    def busy(self):
+        with self._lock:
+            return self._current is not None or bool(self._pending)
+
+    def close(self):
+        self.stop_all()
+        self.scheduler.cancel_channel(self)
+
+    def _cancelled(self, handle):
+        with self._lock:
+            if handle in self._pending:
+                self._pending.remove(handle)
+            elif handle is self._current:
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._current = self._timer = None
+            else:
+                return  # already ending
+        handle._finish("cancelled")
+        self.scheduler.call_soon(self._start_next, channel=self)
+
+    def _start_next(self):
+        with self._lock:
+            if self._current is not None or not self._pending:
+                return
+            handle = self._current = self._pending.popleft()
+
+            # Still under the lock: a cue cancelled after it was queued is
+            # never sent, and cancel() can't slip in between the state
+            # change and the sends (which only queue up with a CommandQueue)
+            handle.state = "playing"
+            try:
+                if handle.screen:
+                    self.api.set_screen(image=handle.screen)
+                self.api.play_sound(handle.sound)
+            except Exception as e:
+                print(f"[PLAYBACK] Could not play {handle.sound}: {e}", flush=True)
+            self._timer = self.scheduler.call_later(handle.duration, self._end, handle, channel=self)
+
+    def _end(self, handle):
+        with self._lock:
+            if handle is not self._current:
+                return
+            self._current = self._timer = None
+
+        if handle.on_done is not None:
+            try:
+                handle.on_done()
+            except Exception as e:
+                print(f"[PLAYBACK] on_done error: {e}", flush=True)
+        handle._finish("done")
+        self._start_next()
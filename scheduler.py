@@ -0,0 +1,145 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class Timer:
+    """A scheduled call, returned by Scheduler.call_at / call_later / call_soon."""
+
+    def __init__(self, when, seq, fn, args, channel):
+        self.when = when
+        self.seq = seq
+        self.fn = fn
+        self.args = args
+        self.channel = channel
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __lt__(self, other):
+        return (self.when, self.seq) < (other.when, other.seq)
+
+
+class Scheduler:
+    """
+    One thread that runs timed calls in deadline order (a heap keyed on the
+    monotonic clock). Head motion, LED frames, screen changes and audio cues
+    all put their next step on it instead of each sleeping in a thread of
+    their own.
+
+        scheduler = default_scheduler()
+        scheduler.call_later(0.5, api.set_screen, "happy.gif", channel="screen")
+        scheduler.cancel_channel("screen")   # drop everything still pending there
+        scheduler.wait()                     # idle until stop() / Ctrl+C
+
+    Callbacks run on the scheduler thread and should return quickly; network
+    sends are best done through a CommandQueue, which has its own sender.
+    Everything can be called from any thread.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.calls = 0
+        self.max_lateness = 0.0
+
+    # ---------- scheduling ----------
+
+    def call_at(self, when, fn, *args, channel=None):
+        """Runs fn(*args) at time.monotonic() == when (or as soon as possible after)."""
+        timer = Timer(when, next(self._seq), fn, args, channel)
+        with self._cond:
+            heapq.heappush(self._heap, timer)
+            if self._heap[0] is timer:
+                self._cond.notify()
+        return timer
+
+    def call_later(self, delay, fn, *args, channel=None):
+        return self.call_at(time.monotonic() + delay, fn, *args, channel=channel)
+
+    def call_soon(self, fn, *args, channel=None):
+        return self.call_at(time.monotonic(), fn, *args, channel=channel)
+
+    def cancel_channel(self, channel):
+        """Cancels every pending call of that channel (e.g. the old emotion's motion)."""
+        with self._cond:
+            for timer in self._heap:
+                if timer.channel == channel:
+                    timer.cancel()
+
+    def pending(self, channel=None):
+        with self._cond:
+            return sum(1 for timer in self._heap
+                       if not timer.cancelled and (channel is None or timer.channel == channel))
+
+    # ---------- running ----------
+
+    def start(self):
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def wait(self, timeout=None):
+        """
+        Blocks the calling thread (near 0% CPU) until stop() is called or the
+        timeout runs out. Wakes up once a second so Ctrl+C still works.
+        Returns True if the scheduler was stopped.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stopped.is_set():
+            remaining = 1.0 if deadline is None else min(1.0, deadline - time.monotonic())
+            if remaining <= 0:
+                break
+            self._stopped.wait(remaining)
+        return self._stopped.is_set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._cond:
+                while self._heap and self._heap[0].cancelled:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0].when - time.monotonic()
+                if delay > 0:
+                    # Woken early if an earlier call is added
+                    self._cond.wait(delay)
+                    continue
+                timer = heapq.heappop(self._heap)
+
+            self.calls += 1
+            self.max_lateness = max(self.max_lateness, -delay)
+            try:
+                timer.fn(*timer.args)
+            except Exception as e:
+                print(f"[SCHEDULER] Error in {getattr(timer.fn, '__name__', timer.fn)}: {e}", flush=True)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler():
+    """The shared, already started Scheduler."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Scheduler().start()
+        return _default
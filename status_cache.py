@@ -0,0 +1,84 @@
+import threading
+import time
+
+from ElmoV2API import ElmoV2API
+
+
+class StatusCache:
+    """
+    Keeps the last ElmoV2API.status() snapshot (pan, tilt, limits, touch
+    sensors...) in memory.
+
+    get() only goes to the robot when the snapshot is older than ttl seconds.
+    With poll_interval set, a background thread refreshes the snapshot on its
+    own, so readers never wait for the network.
+    """
+
+    def __init__(self, api: ElmoV2API, ttl=0.5, poll_interval=None):
+        self.api = api
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+
+        self._snapshot = None
+        self._timestamp = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        if poll_interval:
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+
+    def get(self, max_age=None):
+        """
+        Returns the status dict, fetching a new one if the cached one is older
+        than max_age (defaults to the ttl). Returns None if the robot never answered.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        if self._snapshot is not None and self.age() <= max_age:
+            return self._snapshot
+
+        with self._lock:
+            # Another thread may have refreshed it while we waited for the lock
+            if self._snapshot is not None and self.age() <= max_age:
+                return self._snapshot
+            return self._refresh()
+
+    # Same name as ElmoV2API, so the cache can be passed where an api is read
+    def status(self):
+        return self.get()
+
+    def value(self, key, default=None):
+        status = self.get()
+        if not status:
+            return default
+        return status.get(key, default)
+
+    def age(self):
+        """Seconds since the last successful fetch."""
+        return time.monotonic() - self._timestamp
+
+    def invalidate(self):
+        self._timestamp = 0.0
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def _refresh(self):
+        status = self.api.status()
+        if status:
+            self._snapshot = status
+            self._timestamp = time.monotonic()
+        # On failure keep serving the last good snapshot
+        return self._snapshot
+
+    def _poll(self):
+        while not self._stop.is_set():
+            try:
+                with self._lock:
+                    self._refresh()
+            except Exception as e:
+                print(f"[STATUS] Poll error: {e}", flush=True)
+            self._stop.wait(self.poll_interval)
@@ -2,14 +2,21 @@ import os
 import sys
 import time
 
-import requests
-
+from audio_index import AudioIndex
+from camera import MjpegStream, WebcamSource
+from command_queue import CommandQueue
+from face_tracking import FaceDetector, FaceTracker, check_pan_angle, check_tilt_angle
 from test import ElmoEmotionManager
 import cv2
 
 import numpy as np
-from PIL import Image, ImageEnhance
 from ElmoV2API import ElmoV2API
+from led_animation import LedAnimationPlayer
+from led_frames import LedFrameCompiler, image_to_rgb_array
+from led_state import LedStateTracker
+from playback import CuePlayer
+from status_cache import StatusCache
+import telemetry
 
 # from ElmoV2API import ElmoV2API # Uncomment when running on actual robot
 # Mock class for testing on PC without robot
@@ -20,9 +27,6 @@ except ImportError:
     print("Please run: pip install pygame")
     sys.exit(1)
 
-import wave
-import contextlib
-
 '''
 # ==========================================
 # MOCK API WITH REAL AUDIO PLAYBACK
@@ -64,6 +68,13 @@ class ElmoV2API:
 
 MACHINE_VIDEO_PATH = "../group5/emotions/machine_vids"
 MACHINE_AUDIO_PATH = "../group5/sounds/Robotic"
+# Local copies of the robot's sound files, used for clip durations
+LOCAL_AUDIO_PATHS = {
+    "MACHINE": "Sounds/Robotic",
+    "HUMAN": "Sounds/Human"
+}
+# LED animation frames ('frame_000_delay-0.04s.png' ...)
+LED_FRAMES_DIR = "Emotions/led_grid"
 
 AUDIO_PATHS = {
     "MACHINE": MACHINE_VIDEO_PATH,  # Default to video path for self.folder, handled in play_file
@@ -122,100 +133,58 @@ SCENARIOS = {
 # CONTROLLER CLASS
 # ==========================================
 
-def check_tilt_angle(angle):
-    """
-    Checks if the tilt angle is valid. If it is not valid then returns a
-    valid angle.
-
-    Returns:
-        int: The angle
-    """
-    if angle > 15:
-        angle = 15
-    elif angle < -15:
-        angle = -15
-    return angle
-
-
-def check_pan_angle(angle):
-    """
-    Checks if the pan angle is valid. If it is not valid then returns a
-    valid angle.
-
-    Returns:
-        int: The angle
-    """
-    if angle > 40:
-        angle = 40
-    elif angle < -40:
-        angle = -40
-    return angle
-
-
 class ExperimentController:
     def image_to_rgb_array(self, image_path, contrast=2.0, color=1.5, brightness=0.8):
-        """
-        contrast: 1.0 is original. >1.0 makes darks darker and lights lighter.
-        color: 1.0 is original. >1.0 makes colors more vibrant (saturation).
-        brightness: 1.0 is original. <1.0 makes the whole image darker.
-        """
-        try:
-            with Image.open(image_path) as img:
-                # 1. Convert to RGB
-                img = img.convert('RGB')
-
-                # 2. ENHANCE IMAGE (Fixing the "Very Light" issue)
-                # Adjust Contrast
-                enhancer = ImageEnhance.Contrast(img)
-                img = enhancer.enhance(contrast)
-
-                # Adjust Color (Saturation)
-                enhancer = ImageEnhance.Color(img)
-                img = enhancer.enhance(color)
-
-                # Adjust Brightness (Optional: prevents "washed out" look)
-                enhancer = ImageEnhance.Brightness(img)
-                img = enhancer.enhance(brightness)
-
-                # 3. Resize to 13x13
-                # Using LANCZOS is high quality, but if you want a "blocky" look,
-                # change Resampling.LANCZOS to Resampling.NEAREST
-                img_resized = img.resize((13, 13), resample=Image.Resampling.LANCZOS)
-
-                # 4. Convert to NumPy array
-                rgb_array = np.array(img_resized)
-
-                # 5. Clean up low values (Optional "Gamma" fix)
-                # This forces weak pixels (like dark grey noise) to become pure black (0)
-                # Any pixel value less than 30 becomes 0
-                rgb_array[rgb_array < 30] = 0
-
-                return rgb_array
-
-        except FileNotFoundError:
-            print(f"Error: The file '{image_path}' was not found.")
-            return None
-        except Exception as e:
-            print(f"An error occurred: {e}")
-            return None
+        """Kept for existing callers, see led_frames.image_to_rgb_array."""
+        return image_to_rgb_array(image_path, contrast=contrast, color=color, brightness=brightness)
 
     def __init__(self, robot_ip, condition):
         self.connect_mode = False
+        self.camera = None
+        self.face_detector = None
+        self.tracker = None
         if robot_ip == "debug":
             self.center_player()
         self.robot_ip = robot_ip
+        # Session log (telemetry/<condition>_<date>_NNN.jsonl): commands, keys, faces, motion
+        self.telemetry = telemetry.start(session=condition.upper())
+        telemetry.record("session", condition=condition.upper(), robot_ip=robot_ip)
         self.robot = ElmoV2API(robot_ip)
+        self.status = StatusCache(self.robot, ttl=0.5)
         if not condition == "MACHINE":
-            self.motion_controller = ElmoEmotionManager(self.robot)
+            self.motion_controller = ElmoEmotionManager(self.robot, status_cache=self.status)
         self.condition = condition.upper()  # MACHINE or HUMAN
+        # LEDs, cues and faces are sent from the shared scheduler thread: they
+        # go through a latest-wins queue (the emotion manager's in HUMAN mode),
+        # so a slow robot never holds up the head motion setpoints
+        if self.condition == "HUMAN":
+            self.commands = self.motion_controller.api
+        else:
+            self.commands = CommandQueue(self.robot)
         self.folder = AUDIO_PATHS[self.condition]
         self.data = SCENARIOS[self.condition]  # Shortcut to specific condition data
 
+        # LED animation, compiled to 13x13 frames on first play (cached in .led_cache)
+        self.led_compiler = LedFrameCompiler()
+        # Only changed frames are sent (always in full: delta ops need a direct ElmoV2API)
+        self.led_player = LedAnimationPlayer(LedStateTracker(self.commands), self.led_compiler)
+
+        # Clip durations, read once (cached in .audio_index.json)
+        self.audio = AudioIndex()
+        self.check_audio()
+        # Cues play in the background; the console stays responsive
+        self.cues = CuePlayer(self.commands)
+
         print(f"\n--- CONNECTED TO ELMO ({self.condition} MODE) ---")
         # print(self.robot.status()) # Optional check
 
-    def play_file(self, filename):
-        """Helper to play sound or video with full path"""
+    def play_file(self, filename, interrupt=False):
+        """
+        Helper to play sound or video with full path. Returns right away with
+        a Playback handle (see playback.py) that completes when the clip ends.
+
+        interrupt: cancel the playing/queued cues instead of queueing after them.
+        """
         if filename:
             if self.condition == "MACHINE":
                 audio_filename = filename.replace(".mp4", ".wav")
@@ -223,50 +192,53 @@ class ExperimentController:
                 print(f"   -> [AUDIO] Playing: {audio_path}...")
 
                 gif_path = "../group5/emotions/circle_gif.gif"
-                self.robot.set_screen(image=gif_path)
-
-                self.robot.play_sound(audio_path)
 
-                local_path = f"Sounds/Robotic/{audio_filename}"
-                try:
-                    with contextlib.closing(wave.open(local_path, 'r')) as f:
-                        frames = f.getnframes()
-                        rate = f.getframerate()
-                        duration = frames / float(rate)
-                        time.sleep(duration)
-                except Exception as e:
-                    print(f"   -> [WARNING] Could not calculate duration from {local_path}: {e}")
-                    time.sleep(2)  # Fallback
+                local_path = f"{LOCAL_AUDIO_PATHS['MACHINE']}/{audio_filename}"
+                duration = self.audio.duration(local_path)
+                if duration is None:
+                    print(f"   -> [WARNING] No duration for {local_path}, assuming 2s")
+                    duration = 2  # Fallback
 
-                # Reset Screen
-                self.set_face("neutral_machine")
+                # Reset Screen once the clip has played to the end
+                return self.cues.play(audio_path, duration, screen=gif_path,
+                                      on_done=lambda: self.set_face("neutral_machine"),
+                                      interrupt=interrupt)
 
                 '''
-                files = os.listdir("Emotions/led_grid")
-
-                for file in files:
-                    numpy_grid = self.image_to_rgb_array(os.path.join("Emotions/led_grid", file), contrast=2.5, color=1.5, brightness=0.9)
-
-                    if numpy_grid is not None:
-                        # 5. Format for the Robot API
-                        flat_grid = numpy_grid.reshape(-1, 3)
-                        led_argument = flat_grid.tolist()
-
-                        print(f"Sending {len(led_argument)} pixels to the robot...")
-
-                        self.robot.update_leds(colors=led_argument)
-                    else:
-                        print("Image processing failed.")
+                # Frames are compiled once (then cached) and played at their own
+                # frame rate in the background
+                self.play_leds()
                 '''
 
             else:
-                # HUMAN MODE (Standard)
+                # HUMAN MODE (Standard): queued after the current cue, or
+                # played right away with interrupt (the !x keys)
                 full_path = f"{self.folder}/{filename}"
                 print(f"   -> [AUDIO] Playing: {full_path}...")
-                self.robot.play_sound(full_path)
+                duration = self.audio.duration(f"{LOCAL_AUDIO_PATHS['HUMAN']}/{filename}", 0)
+                return self.cues.play(full_path, duration, interrupt=interrupt)
         else:
             print("   -> [ERROR] No filename provided.")
 
+    def play_leds(self, loop=False):
+        """Plays the LED animation, loading its frames on first use."""
+        if not self.led_player.payloads:
+            self.led_player.load_dir(LED_FRAMES_DIR)
+        self.led_player.play(loop=loop)
+
+    def check_audio(self):
+        """Warns at startup about scenario sounds that have no local copy."""
+        filenames = set()
+        for phase in self.data.values():
+            for item in phase.values():
+                if "file" in item:
+                    filenames.add(item["file"].replace(".mp4", ".wav"))
+
+        missing = self.audio.missing(sorted(filenames), LOCAL_AUDIO_PATHS[self.condition])
+        for filename in missing:
+            print(f"[WARNING] Sound file missing: {LOCAL_AUDIO_PATHS[self.condition]}/{filename}")
+        return missing
+
     def grab_image(self):
         """
         Captures an image.
@@ -275,40 +247,17 @@ class ExperimentController:
             np.ndarray: The captured image.
         """
 
-        if not self.connect_mode:
-            cap = cv2.VideoCapture(1)
-            time.sleep(1)
-
-            if not cap.isOpened():
-                print("Failed to open camera")
-
-            ret, frame = cap.read()  # Capture a frame
-
-            if not ret:
-                print("Failed to capture frame")
-                cap.release()
-                return np.full((480, 640, 3), 26, dtype=np.uint8)
+        # One capture source for the whole session, grabbing is a memory read
+        if self.camera is None:
+            if self.connect_mode:
+                self.camera = MjpegStream(f"http://{self.robot_ip}:8080/stream.mjpg").start()
+            else:
+                self.camera = WebcamSource(1).start()
 
-            cap.release()
-
-        else:
-            url = f"http://{self.robot_ip}:8080/stream.mjpg"
-            response = requests.get(url, stream=True)
-
-            if response.status_code == 200:  # Is a valid response
-                stream = response.iter_content(chunk_size=1024)
-                bytes_ = b""
-                for chunk in stream:
-                    bytes_ += chunk
-                    a = bytes_.find(b"\xff\xd8")
-                    b = bytes_.find(b"\xff\xd9")
-                    if a != -1 and b != -1:
-                        jpg = bytes_[a: b + 2]
-                        bytes_ = bytes_[b + 2:]
-                        frame = cv2.imdecode(
-                            np.fromstring(jpg, dtype=np.uint8), cv2.IMREAD_COLOR
-                        )
-                        break
+        frame = self.camera.wait_frame(timeout=3.0)
+        if frame is None:
+            print("Failed to capture frame")
+            return np.full((480, 640, 3), 26, dtype=np.uint8)
 
         # Resize the image to 480x640
         frame = cv2.resize(frame, (640, 480))
@@ -319,16 +268,14 @@ class ExperimentController:
         Centers the player's face in the frame by adjusting the robot's pan and
         tilt angles. If no faces detected, returns and continues the game.
         """
-        face_classifier = cv2.CascadeClassifier(
-            cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-        )
+        if self.face_detector is None:
+            self.face_detector = FaceDetector()
 
         frame = self.grab_image()
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_classifier.detectMultiScale(gray, 1.1, 5, minSize=(100, 100))
+        face = self.face_detector.detect(frame)
 
-        if len(faces) == 0:
+        if face is None:
             print("Cannot center player. No faces detected.")
             return
 
@@ -338,7 +285,7 @@ class ExperimentController:
         frame_center_y = frame_height / 2
 
         # Extract face bounding box
-        x, y, w, h = faces[0]
+        x, y, w, h = face
         cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
         # Compute offsets
@@ -347,9 +294,13 @@ class ExperimentController:
         horizontal_offset = face_center_x - frame_center_x
         vertical_offset = frame_center_y - face_center_y
 
-        # Get current pan and tilt angles
-        current_pan_angle = self.robot.status()['pan']
-        current_tilt_angle = self.robot.status()['tilt']
+        # Get current pan and tilt angles (one cached status read)
+        status = self.status.get()
+        if not status:
+            print("Cannot center player. No status from the robot.")
+            return
+        current_pan_angle = status['pan']
+        current_tilt_angle = status['tilt']
 
         # Convert pixel offsets to angle corrections using camera FOV
         horizontal_adjustment = (horizontal_offset / frame_width) * 62.2  # Use 62.2° FOV for pan
@@ -363,7 +314,13 @@ class ExperimentController:
         new_pan_angle = check_pan_angle(new_pan_angle)
         new_tilt_angle = check_tilt_angle(new_tilt_angle)
 
-        self.motion_controller.motion.smooth_move_for_emotion(target_pan=new_pan_angle, target_tilt=new_tilt_angle)
+        if self.condition == "HUMAN":
+            self.motion_controller.motion.smooth_move_for_emotion(
+                self.motion_controller.current_emotion, target_pan=new_pan_angle, target_tilt=new_tilt_angle)
+        else:
+            self.robot.set_head(new_pan_angle, new_tilt_angle)
+        # The cached pan/tilt are from before the move
+        self.status.invalidate()
 
         # Save changes
         print(f"Face center: ({face_center_x}, {face_center_y})")
@@ -372,6 +329,32 @@ class ExperimentController:
         print(f"New pan angle: {new_pan_angle}, Current pan angle: {current_pan_angle}")
         print(f"New tilt angle: {new_tilt_angle}, Current tilt angle: {current_tilt_angle}")
 
+    def start_tracking(self, rate_hz=10.0):
+        """Keeps the player's face centered continuously (see FaceTracker)."""
+        if self.tracker is not None:
+            return
+        self.grab_image()  # opens the camera
+        if self.face_detector is None:
+            self.face_detector = FaceDetector()
+        # In HUMAN mode, go through the emotion manager's latest-wins queue
+        api = self.motion_controller.api if self.condition == "HUMAN" else self.robot
+        self.tracker = FaceTracker(api, self.camera, status_cache=self.status,
+                                   detector=self.face_detector, rate_hz=rate_hz)
+        if self.condition == "HUMAN":
+            # The emotion pattern would fight the tracker over the head
+            self.motion_controller.motion.pause()
+        self.tracker.start()
+
+    def stop_tracking(self):
+        if self.tracker is not None:
+            print(f"   -> [TRACKING] {self.tracker.stats()}")
+            self.tracker.stop()
+            if self.condition == "HUMAN":
+                # The pattern carries on from where tracking left the head
+                self.motion_controller.motion.resume(self.tracker.pan, self.tracker.tilt)
+            self.status.invalidate()
+            self.tracker = None
+
     def set_face(self, expression):
         """
         Sets the screen based on expression name.
@@ -396,10 +379,18 @@ class ExperimentController:
                 self.motion_controller.set_emotion(expression)
                 time.sleep(2)
             else:
-                self.robot.set_screen(image=target)
+                self.commands.set_screen(image=target)
 
+            telemetry.record("face", expression=expression, target=target)
             print(f"   -> [FACE] Set to: {target}")
 
+    def stop_cues(self):
+        """Cancels the playing and queued cues and goes back to the neutral face."""
+        cancelled = self.cues.stop_all()
+        print(f"   -> [AUDIO] Stopped {len(cancelled)} cue(s)")
+        if self.condition == "MACHINE":
+            self.set_face("neutral_machine")
+
     def print_menu(self, phase_key):
         """Dynamically prints the menu based on the config dict"""
         print(f"\n=== {phase_key} PHASE ({self.condition}) ===")
@@ -411,12 +402,16 @@ class ExperimentController:
         # Print items sorted by key for readability
         for key in sorted(phase_data.keys()):
             print(f"[{key}]   | {phase_data[key]['desc']}")
+        print("[!x]  | Interrupt the current cue and play x")
+        print("[-]   | Stop all cues")
         print("[q]   | Quit Phase")
         print("-" * 40)
 
-    def execute_command(self, phase_key, cmd):
+    def execute_command(self, phase_key, cmd, interrupt=False):
         """Looks up the command in the config and executes it"""
         phase_data = self.data[phase_key]
+        telemetry.record("key", phase=phase_key, key=cmd, valid=cmd in phase_data, interrupt=interrupt,
+                         file=phase_data.get(cmd, {}).get("file"))
 
         if cmd in phase_data:
             item = phase_data[cmd]
@@ -453,7 +448,7 @@ class ExperimentController:
                         self.set_face("neutral")
 
             if not cmd == 'n':
-                self.play_file(item['file'])
+                self.play_file(item['file'], interrupt=interrupt)
             return True
         else:
             return False
@@ -463,6 +458,7 @@ class ExperimentController:
     # ==========================================
 
     def run_phase(self, phase_name):
+        telemetry.record("phase", phase=phase_name)
         if self.condition == "MACHINE":
             self.set_face("neutral_machine")
         else:
@@ -474,7 +470,13 @@ class ExperimentController:
             if cmd == 'q':
                 break
 
-            if not self.execute_command(phase_name, cmd):
+            if cmd == '-':
+                telemetry.record("key", phase=phase_name, key=cmd)
+                self.stop_cues()
+                continue
+
+            interrupt = cmd.startswith('!')
+            if not self.execute_command(phase_name, cmd.lstrip('!'), interrupt=interrupt):
                 print("Invalid command. Try again.")
 
 
@@ -507,6 +509,7 @@ if __name__ == "__main__":
         print("\n------------- MAIN MENU -------------")
         print("1. Start Exploration Phase")
         print("2. Start Data Collection Phase")
+        print("t. Toggle Face Tracking")
         print("x. Exit")
 
         selection = input("Select: ")
@@ -515,6 +518,13 @@ if __name__ == "__main__":
             experiment.run_phase("EXPLORATION")
         elif selection == '2':
             experiment.run_phase("DATA COLLECTION")
+        elif selection == 't':
+            if experiment.tracker is None:
+                experiment.start_tracking()
+            else:
+                experiment.stop_tracking()
         elif selection == 'x':
+            experiment.stop_tracking()
+            telemetry.stop()  # writes out the rest of the session log
             print("Exiting...")
             break
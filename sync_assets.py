@@ -0,0 +1,266 @@
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# --- CONFIGURATION ---
+# Where the robot serves media from (see README, "How to add images...")
+REMOTE_ROOT = "/home/idmind/elmo-v2/src/static"
+SSH_USER = "idmind"
+SSH_PASSWORD = "asdf"
+
+# Local folder -> folder under REMOTE_ROOT. The study code refers to these
+# as ../group5/emotions/..., ../group5/sounds/... (relative to static/images
+# and static/sounds).
+SYNC_DIRS = {
+    "Emotions": "group5/emotions",
+    "Emotions/robotic_voices/output_videos": "group5/emotions/machine_vids",
+    "Sounds": "group5/sounds",
+}
+# Local folders left out of the walk (the raw videos are only transcoder input)
+EXCLUDE_DIRS = ("Emotions/robotic_voices",)
+
+MANIFEST_NAME = ".asset_manifest.json"    # on the robot, in REMOTE_ROOT
+HASH_CACHE_FILE = ".asset_hashes.json"    # local, so unchanged files are not re-hashed
+# ---------------------
+
+
+def file_sha1(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_assets(sync_dirs=SYNC_DIRS, exclude=EXCLUDE_DIRS, cache_path=HASH_CACHE_FILE):
+    """
+    {remote relative path: (local path, sha1)} for every file in the synced
+    folders. Hashes are cached by (size, mtime), so only new or edited files
+    are read.
+    """
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    exclude = {os.path.normpath(d) for d in exclude} - {os.path.normpath(d) for d in sync_dirs}
+    assets = {}
+    new_cache = {}
+    for local_dir, remote_dir in sync_dirs.items():
+        for root, dirs, files in os.walk(local_dir):
+            dirs[:] = sorted(d for d in dirs if os.path.normpath(os.path.join(root, d)) not in exclude)
+            for name in sorted(files):
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                stamp = [stat.st_size, stat.st_mtime_ns]
+
+                entry = cache.get(path)
+                digest = entry["sha1"] if entry and entry["stamp"] == stamp else file_sha1(path)
+                new_cache[path] = {"stamp": stamp, "sha1": digest}
+
+                relative = os.path.relpath(path, local_dir).replace(os.sep, "/")
+                assets[posixpath.join(remote_dir, relative)] = (path, digest)
+
+    try:
+        with open(cache_path, "w") as f:
+            json.dump(new_cache, f)
+    except OSError as e:
+        print(f"Could not write hash cache {cache_path}: {e}")
+    return assets
+
+
+# ---------- transports ----------
+
+class LocalTransport:
+    """A directory standing in for the robot (tests, dry runs, a mounted share)."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def read_manifest(self):
+        try:
+            with open(os.path.join(self.root, MANIFEST_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    def upload(self, local_path, remote_path):
+        target = os.path.join(self.root, *remote_path.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(local_path, target)
+
+    def close(self):
+        pass
+
+
+class SftpTransport:
+    """
+    The robot over SSH. Needs paramiko (pip install paramiko).
+
+    One SSH connection is shared; every upload thread opens its own SFTP
+    channel on it, so files go up in parallel.
+    """
+
+    def __init__(self, host, user=SSH_USER, password=SSH_PASSWORD, root=REMOTE_ROOT, port=22):
+        try:
+            import paramiko
+        except ImportError:
+            print("ERROR: 'paramiko' library is missing.")
+            print("Please run: pip install paramiko")
+            raise
+
+        self.root = root
+        self.client = paramiko.SSHClient()
+        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.client.connect(host, port=port, username=user, password=password)
+        self._local = threading.local()
+        self._sftps = []
+        self._lock = threading.Lock()
+        self._dirs = set()
+
+    def _sftp(self):
+        sftp = getattr(self._local, "sftp", None)
+        if sftp is None:
+            sftp = self._local.sftp = self.client.open_sftp()
+            with self._lock:
+                self._sftps.append(sftp)
+        return sftp
+
+    def _makedirs(self, sftp, directory):
+        missing = []
+        while directory not in self._dirs and directory not in ("", "/"):
+            try:
+                sftp.stat(directory)
+                break
+            except IOError:
+                missing.append(directory)
+                directory = posixpath.dirname(directory)
+        for path in reversed(missing):
+            try:
+                sftp.mkdir(path)
+            except IOError:
+                pass  # created by another thread meanwhile
+        with self._lock:
+            self._dirs.update(missing)
+
+    def read_manifest(self):
+        try:
+            with self._sftp().open(posixpath.join(self.root, MANIFEST_NAME)) as f:
+                return json.loads(f.read().decode("utf-8"))
+        except (IOError, ValueError):
+            return {}
+
+    def write_manifest(self, manifest):
+        with self._sftp().open(posixpath.join(self.root, MANIFEST_NAME), "w") as f:
+            f.write(json.dumps(manifest, indent=2))
+
+    def upload(self, local_path, remote_path):
+        sftp = self._sftp()
+        target = posixpath.join(self.root, remote_path)
+        self._makedirs(sftp, posixpath.dirname(target))
+        sftp.put(local_path, target)
+
+    def close(self):
+        for sftp in self._sftps:
+            sftp.close()
+        self.client.close()
+
+
+# ---------- sync ----------
+
+def sync_assets(transport, assets=None, workers=4, dry_run=False):
+    """
+    Uploads every asset whose hash differs from the robot's manifest, with
+    `workers` uploads at a time, then writes the updated manifest back.
+    Files that fail to upload stay out of the manifest and are retried on
+    the next run.
+
+    Returns {"uploaded": [...], "failed": [...], "unchanged": n, "bytes": n, "seconds": t}.
+    """
+    start = time.perf_counter()
+    if assets is None:
+        assets = local_assets()
+    remote = transport.read_manifest()
+
+    changed = [path for path, (_, digest) in sorted(assets.items()) if remote.get(path) != digest]
+    result = {"uploaded": [], "failed": [], "unchanged": len(assets) - len(changed), "bytes": 0}
+    print(f"{len(assets)} assets, {len(changed)} new or changed")
+
+    if dry_run:
+        for path in changed:
+            print(f"  would upload {path}")
+        result["uploaded"] = changed
+        result["seconds"] = time.perf_counter() - start
+        return result
+
+    def upload(path):
+        local_path = assets[path][0]
+        transport.upload(local_path, path)
+        return os.path.getsize(local_path)
+
+    manifest = dict(remote)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(upload, path): path for path in changed}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                result["bytes"] += future.result()
+            except Exception as e:
+                print(f"  [{done}/{len(changed)}] FAILED {path}: {e}")
+                result["failed"].append(path)
+                continue
+            manifest[path] = assets[path][1]
+            result["uploaded"].append(path)
+            print(f"  [{done}/{len(changed)}] {path}")
+
+    if changed:
+        transport.write_manifest(manifest)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push Emotions/ and Sounds/ to the robot, only what changed.")
+    parser.add_argument("robot_ip", nargs="?", help="robot address (SFTP)")
+    parser.add_argument("--local", metavar="DIR", help="sync into a local directory instead of the robot")
+    parser.add_argument("--workers", type=int, default=4, help="parallel uploads (default 4)")
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be uploaded")
+    args = parser.parse_args()
+
+    if args.local:
+        transport = LocalTransport(args.local)
+    elif args.robot_ip:
+        transport = SftpTransport(args.robot_ip)
+    else:
+        parser.print_usage()
+        sys.exit(1)
+
+    try:
+        result = sync_assets(transport, workers=args.workers, dry_run=args.dry_run)
+    finally:
+        transport.close()
+
+    print(f"Uploaded {len(result['uploaded'])} files ({result['bytes'] / 1e6:.1f} MB), "
+          f"{result['unchanged']} unchanged, {len(result['failed'])} failed, "
+          f"in {result['seconds']:.1f}s")
+    if result["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
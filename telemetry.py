@@ -0,0 +1,147 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_DIR = "telemetry"
+MAX_FILE_BYTES = 10 * 1024 * 1024
+
+
+class TelemetryRecorder:
+    """
+    Session log: timestamped events appended to JSONL files.
+
+    record() only appends a tuple to an in-memory deque (a few microseconds,
+    no I/O, no JSON); a writer thread serialises and writes the events every
+    flush_interval seconds. When a file reaches max_bytes the log continues
+    in the next numbered file:
+
+        telemetry/HUMAN_20260301-141500_000.jsonl
+        telemetry/HUMAN_20260301-141500_001.jsonl
+
+    Each line is {"t": unix time, "mono": monotonic time, "event": kind, ...fields}.
+    If the writer falls behind by more than max_pending events, the oldest
+    ones are dropped (counted in .dropped) rather than slowing the caller.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, session="session", max_bytes=MAX_FILE_BYTES,
+                 flush_interval=0.5, max_pending=100000):
+        self.directory = directory
+        self.session = f"{session}_{time.strftime('%Y%m%d-%H%M%S')}"
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+
+        self._events = deque(maxlen=max_pending)
+        self._appended = 0
+        self._written = 0
+        self._file = None
+        self._file_index = -1
+        self._file_bytes = 0
+        self._stop = threading.Event()
+        # The writer thread and close() never write at the same time
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        return self._appended - self._written - len(self._events)
+
+    def record(self, event, fields):
+        self._events.append((time.time(), time.monotonic(), event, fields))
+        self._appended += 1
+
+    def flush(self):
+        """Writes everything recorded so far (called by the writer thread and on close)."""
+        with self._write_lock:
+            if not self._closed:
+                self._write_pending()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        with self._write_lock:
+            if self._closed:
+                return
+            self._write_pending()
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write_pending(self):
+        lines = []
+        while self._events:
+            try:
+                wall, mono, event, fields = self._events.popleft()
+            except IndexError:
+                break
+            lines.append(json.dumps({"t": wall, "mono": mono, "event": event, **fields}, default=str))
+        if not lines:
+            return
+
+        for line in lines:
+            if self._file is None or self._file_bytes >= self.max_bytes:
+                self._rotate()
+            data = line + "\n"
+            self._file.write(data)
+            self._file_bytes += len(data)
+        self._file.flush()
+        self._written += len(lines)
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        self._file_index += 1
+        path = os.path.join(self.directory, f"{self.session}_{self._file_index:03d}.jsonl")
+        self._file = open(path, "a", encoding="utf-8")
+        self._file_bytes = 0
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[TELEMETRY] Write error: {e}", flush=True)
+
+
+# ---------- process-wide recorder ----------
+# Instrumented code calls telemetry.record(...), which does nothing until a
+# recorder is started. The recorder is closed (and written out) at exit,
+# including after Ctrl+C or an uncaught exception.
+
+_recorder = None
+_atexit_registered = False
+
+
+def start(session="session", **kwargs):
+    """Starts recording to a new session log and returns the recorder."""
+    global _recorder, _atexit_registered
+    stop()
+    _recorder = TelemetryRecorder(session=session, **kwargs)
+    if not _atexit_registered:
+        atexit.register(stop)
+        _atexit_registered = True
+    return _recorder
+
+
+def stop():
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.close()
+
+
+def record(event, **fields):
+    recorder = _recorder
+    if recorder is not None:
+        recorder.record(event, fields)
+
+
+def enabled():
+    return _recorder is not None
@@ -1,8 +1,11 @@
 import threading
-import time
-import random
 
+import telemetry
 from ElmoV2API import ElmoV2API  # <-- your file with ElmoV2API
+from command_queue import CommandQueue
+from motion_trajectories import (DEFAULT_RATE_HZ, EMOTION_PATTERNS, compile_trajectory, play_trajectory,
+                                 schedule_trajectory)
+from scheduler import default_scheduler
 
 PAN_MIN, PAN_MAX = -40.0, 40.0
 TILT_MIN, TILT_MAX = -90.0, 90.0
@@ -14,18 +17,27 @@ class EmotionMotionController:
     Uses ElmoV2API to send set_pan / set_tilt.
 
     Per-emotion movement parameters are configurable via motion_config.
+    The movements themselves are keyframe patterns (motion_trajectories.py),
+    compiled to setpoints at rate_hz and played against the monotonic clock
+    as calls on the shared Scheduler (no thread of its own).
     """
 
-    def __init__(self, api: ElmoV2API, motion_config=None):
+    def __init__(self, api: ElmoV2API, motion_config=None, status_cache=None,
+                 patterns=None, rate_hz=DEFAULT_RATE_HZ, scheduler=None):
         self.api = api
+        self.scheduler = scheduler or default_scheduler()
+        self.patterns = {**EMOTION_PATTERNS, **(patterns or {})}
+        self.rate_hz = rate_hz
+        # Estimated time to send one setpoint, they go out this much early
+        self.latency = 0.0
 
-        # ---- per-emotion config (duration, steps, pauses) ----
+        # ---- per-emotion config (durations, pauses) ----
         # You can tweak these numbers freely from outside.
         default_config = {
-            "neutral": {"duration_factor": 1.0, "steps": 1, "pause_factor": 1.0},
-            "happy": {"duration_factor": 1.0, "steps": 1, "pause_factor": 1.0},
-            "sad": {"duration_factor": 1.5, "steps": 1, "pause_factor": 1.3},
-            "tired": {"duration_factor": 2.0, "steps": 1, "pause_factor": 1.5},
+            "neutral": {"duration_factor": 1.0, "pause_factor": 1.0},
+            "happy": {"duration_factor": 1.0, "pause_factor": 1.0},
+            "sad": {"duration_factor": 1.5, "pause_factor": 1.3},
+            "tired": {"duration_factor": 2.0, "pause_factor": 1.5},
         }
         # external override
         self.motion_config = default_config
@@ -34,11 +46,13 @@ class EmotionMotionController:
 
         # 1) Disable behaviours that also move the head
         print("[MOTION] Disabling default behaviours (look_around, blush)...", flush=True)
-        self.api.enable_behavior("look_around", False)
-        self.api.enable_behavior("blush", False)
+        with self.api.batch():
+            self.api.enable_behavior("look_around", False)
+            self.api.enable_behavior("blush", False)
 
         # 2) Try to read current pan/tilt/limits from status
-        status = self.api.status()
+        # (a shared StatusCache saves the round trip if it is already fresh)
+        status = status_cache.get() if status_cache else self.api.status()
         if status:
             self.pan = float(status.get("pan", 0.0))
             self.tilt = float(status.get("tilt", 0.0))
@@ -54,15 +68,23 @@ class EmotionMotionController:
             self.tilt_min, self.tilt_max = TILT_MIN, TILT_MAX
 
         # 3) Make sure torque is on
-        self.api.set_pan_torque(True)
-        self.api.set_tilt_torque(True)
+        with self.api.batch():
+            self.api.set_pan_torque(True)
+            self.api.set_tilt_torque(True)
 
         self._emotion = "neutral"
         self._stop = False
-
-        self._thread = threading.Thread(target=self._loop, daemon=True)
-        self._thread.start()
-        print("[MOTION] Motion thread started.", flush=True)
+        # Set while something else steers the head (see pause / resume)
+        self._paused = False
+        # Set when the emotion changes (or on stop) so a blocking
+        # smooth_move_for_emotion is abandoned halfway
+        self._emotion_changed = threading.Event()
+        self._restart_lock = threading.Lock()
+        # Bumped on every restart, so steps of an older pattern stop themselves
+        self._generation = 0
+
+        self._restart()
+        print("[MOTION] Motion scheduled.", flush=True)
 
     # ---------- public API ----------
 
@@ -70,174 +92,117 @@ class EmotionMotionController:
         emotion = emotion.lower()
         if emotion not in {"happy", "sad", "tired", "neutral", "fear"}:
             emotion = "neutral"
-        print("[MOTION] Emotion set to: {emotion}", flush=True)
-        self._emotion = emotion
+        print(f"[MOTION] Emotion set to: {emotion}", flush=True)
+        telemetry.record("emotion", emotion=emotion, previous=self._emotion)
+        if emotion != self._emotion:
+            self._emotion = emotion
+            self._emotion_changed.set()
+            # Drop the rest of the old pattern, start the new one now
+            self._restart()
+
+    def pause(self):
+        """
+        Stops the pattern until resume(), e.g. while a FaceTracker steers the
+        head. Emotion changes in between are kept and start on resume.
+        """
+        with self._restart_lock:
+            self._paused = True
+            self._generation += 1
+            self.scheduler.cancel_channel(self)
+
+    def resume(self, pan=None, tilt=None):
+        """Starts the pattern again, from pan/tilt if given (where the head was left)."""
+        if pan is not None:
+            self.pan = float(pan)
+        if tilt is not None:
+            self.tilt = float(tilt)
+        with self._restart_lock:
+            self._paused = False
+        self._restart()
 
     def stop(self):
-        print("[MOTION] Stopping motion thread...", flush=True)
+        print("[MOTION] Stopping motion...", flush=True)
         self._stop = True
-        self._thread.join(timeout=1.0)
+        self._emotion_changed.set()
+        self.scheduler.cancel_channel(self)
 
     # ---------- config helpers ----------
 
     def _cfg(self, emotion: str):
         return self.motion_config.get(
             emotion,
-            {"duration_factor": 1.0, "steps": 1, "pause_factor": 1.0},
+            {"duration_factor": 1.0, "pause_factor": 1.0},
         )
 
-    def _clamp_pan(self, angle: float) -> float:
-        return max(self.pan_min, min(self.pan_max, angle))
-
-    def _clamp_tilt(self, angle: float) -> float:
-        return max(self.tilt_min, min(self.tilt_max, angle))
-
-    def _smooth_move(self, target_pan=None, target_tilt=None,
-                     duration=0.1, steps=1):
-        if target_pan is None:
-            target_pan = self.pan
-        if target_tilt is None:
-            target_tilt = self.tilt
-
-        start_pan, start_tilt = self.pan, self.tilt
+    def _wait(self, seconds: float) -> bool:
+        """Sleeps, but returns early (True) if the emotion changed or we are stopping."""
+        return self._emotion_changed.wait(seconds)
 
-        for i in range(steps):
-            if self._stop:
-                return
-            alpha = (i + 1) / steps
-            cur_pan = start_pan + alpha * (target_pan - start_pan)
-            cur_tilt = start_tilt + alpha * (target_tilt - start_tilt)
+    def _send(self, pan: float, tilt: float):
+        self.pan, self.tilt = pan, tilt
+        self.api.set_head(pan, tilt)
 
-            cur_pan = self._clamp_pan(cur_pan)
-            cur_tilt = self._clamp_tilt(cur_tilt)
+    def _compile(self, keyframes, emotion: str):
+        """The keyframes as a Trajectory from the current position, at the emotion's speed."""
+        cfg = self._cfg(emotion)
+        return compile_trajectory(
+            keyframes, self.pan, self.tilt, rate_hz=self.rate_hz,
+            duration_factor=cfg.get("duration_factor", 1.0),
+            pause_factor=cfg.get("pause_factor", 1.0),
+            pan_limits=(self.pan_min, self.pan_max),
+            tilt_limits=(self.tilt_min, self.tilt_max),
+        )
 
-            self.pan, self.tilt = cur_pan, cur_tilt
-            self.api.set_pan(cur_pan)
-            self.api.set_tilt(cur_tilt)
-            time.sleep(duration / steps)
+    def _play(self, keyframes, emotion: str) -> bool:
+        """Plays the keyframes on the calling thread. False if interrupted."""
+        completed, self.latency = play_trajectory(self._compile(keyframes, emotion), self._send,
+                                                  self._wait, self.latency)
+        return completed
 
     def smooth_move_for_emotion(self, emotion: str,
                                 target_pan=None, target_tilt=None,
                                 base_duration=0.1, base_steps=1):
-        cfg = self._cfg(emotion)
-        duration = base_duration * cfg["duration_factor"]
-        steps = max(1, int(base_steps * cfg["steps"]))
-        self._smooth_move(target_pan, target_tilt, duration=duration, steps=steps)
-
-    def _pause_for_emotion(self, emotion: str, base_min: float, base_max: float):
-        cfg = self._cfg(emotion)
-        f = cfg["pause_factor"]
-        t = random.uniform(base_min * f, base_max * f)
-        time.sleep(t)
+        """
+        One eased move at the emotion's speed. base_steps is kept for older
+        callers; the smoothness now comes from rate_hz.
+        """
+        keyframe = {"duration": base_duration}
+        if target_pan is not None:
+            keyframe["pan"] = target_pan
+        if target_tilt is not None:
+            keyframe["tilt"] = target_tilt
+
+        # The pattern is paused so it doesn't fight the move, then starts over
+        with self._restart_lock:
+            self._generation += 1
+            self.scheduler.cancel_channel(self)
+        self._emotion_changed.clear()
+        self._play([keyframe], emotion)
+        self._restart()
 
     # ---------- main loop ----------
 
-    def _loop(self):
-        while not self._stop:
-            emo = self._emotion
-            if emo == "happy":
-                self._step_happy()
-            elif emo == "sad":
-                self._step_sad()
-            elif emo == "tired":
-                self._step_tired()
-            elif emo == "fear":
-                self._step_fear()
-            else:
-                self._step_neutral()
-
-    # ---------- emotion patterns ----------
-
-    def _step_neutral(self):
-        emo = "neutral"
-        base_pan = 0.0
-        base_tilt = -2.0  # adjust sign if needed
-
-        self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=0.8, base_steps=1)
-
-        jitter_pan = base_pan + random.uniform(-3, 3)
-        jitter_tilt = base_tilt + random.uniform(-1, 1)
-        self._smooth_move_for_emotion(emo, jitter_pan, jitter_tilt, base_duration=0.5, base_steps=1)
-
-        self._pause_for_emotion(emo, 1.0, 2.0)
-
-    def _step_happy(self):
-        emo = "happy"
-        base_pan = 0.0
-        base_tilt = -20  # slightly up
-        self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=0.6, base_steps=2)
-
-        choice = random.random()
-        if choice > 10.5:
-            # side glance
-            side = random.choice([-60.0, 60.0])
-            self._smooth_move_for_emotion(emo, side, base_tilt, base_duration=0.3, base_steps=1)
-            time.sleep(1)
-            self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=0.3, base_steps=1)
-        elif choice <= 10.5:
-            # sweep
-            self._smooth_move_for_emotion(emo, -35.0, base_tilt, base_duration=0.1, base_steps=1)
-            time.sleep(1)
-            self._smooth_move_for_emotion(emo, 35.0, base_tilt, base_duration=0.1, base_steps=1)
-            time.sleep(1)
-
-            self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=0.4, base_steps=1)
-        else:
-            # small nod
-            self._smooth_move_for_emotion(emo, base_pan, base_tilt - 20, base_duration=0.1, base_steps=1)
-            self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=0.1, base_steps=1)
-
-        self._pause_for_emotion(emo, 0.5, 1.5)
-
-    def _step_fear(self):
-        emo = "fear"
-        base_pan = 0.0
-        base_tilt = -50
-        self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=0.6, base_steps=2)
-
-        self._pause_for_emotion(emo, 0.5, 1.5)
-
-    def _step_sad(self):
-        emo = "sad"
-        base_pan = 0.0
-        base_tilt = 15.0  # your custom 'down' value
-        self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=0.8, base_steps=2)
-
-        choice = random.random()
-        if choice > 1:  # fixed from < -0.6
-            side = random.uniform(-45.0, 45.0)
-            self._smooth_move_for_emotion(emo, side, base_tilt - 40.0, base_duration=1.0, base_steps=1)
-            time.sleep(1)
-            self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=1.0, base_steps=1)
-        else:
-            # droop + back (big nod)
-            drop_tilt = base_tilt + 40.0
-            self._smooth_move_for_emotion(emo, base_pan, drop_tilt, base_duration=1.5, base_steps=1)
-            time.sleep(0.3)
-            self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=1.0, base_steps=1)
-
-        self._pause_for_emotion(emo, 1.5, 3.0)
-
-    def _step_tired(self):
-        emo = "tired"
-        base_pan = 0.0
-        base_tilt = 15.0  # more drooped
-        self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=0.8, base_steps=2)
-
-        choice = random.random()
-        if choice <= 10.7:
-            sway_pan = random.uniform(-30, 30)
-            sway_tilt = -15
-            self._smooth_move_for_emotion(emo, sway_pan, sway_tilt, base_duration=1.2, base_steps=2)
-            time.sleep(1)
-            self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=1.2, base_steps=2)
-        else:
-            drop_tilt = base_tilt - 6.0
-            self._smooth_move_for_emotion(emo, base_pan, drop_tilt, base_duration=2.0, base_steps=2)
-            time.sleep(0.4)
-            self._smooth_move_for_emotion(emo, base_pan, base_tilt, base_duration=1.2, base_steps=2)
-
-        self._pause_for_emotion(emo, 2.0, 4.0)
+    def _restart(self):
+        with self._restart_lock:
+            self._generation += 1
+            self.scheduler.cancel_channel(self)
+            if not self._stop and not self._paused:
+                self.scheduler.call_soon(self._next_pattern, channel=self)
+
+    def _next_pattern(self, latency=None):
+        """Compiles one loop of the current emotion's pattern and schedules it; repeats when it ends."""
+        if latency is not None:
+            self.latency = latency
+        if self._stop:
+            return
+        emo = self._emotion
+        generation = self._generation
+        trajectory = self._compile(self.patterns.get(emo, self.patterns["neutral"]), emo)
+        telemetry.record("motion", emotion=emo, setpoints=len(trajectory), duration=trajectory.duration,
+                         pan=self.pan, tilt=self.tilt, latency=self.latency)
+        schedule_trajectory(self.scheduler, trajectory, self._send, channel=self,
+                            latency=self.latency, on_done=self._next_pattern,
+                            active=lambda: generation == self._generation and not self._stop)
 
 
 class ElmoEmotionManager:
@@ -245,6 +210,8 @@ class ElmoEmotionManager:
     High-level helper:
     - Shows a GIF on the screen using your internal path
     - Updates head posture/motion via EmotionMotionController
+    - Sends pan/tilt/screen through a latest-wins CommandQueue, so setpoints
+      of an old emotion are dropped instead of delaying the new one
     """
 
     GIFS = {
@@ -255,9 +222,10 @@ class ElmoEmotionManager:
         "fear": "ELMO_NEUTRAL.gif"
     }
 
-    def __init__(self, api, motion_config=None):
-        self.api = api
-        self.motion = EmotionMotionController(self.api, motion_config=motion_config)
+    def __init__(self, api, motion_config=None, status_cache=None):
+        self.api = CommandQueue(api)
+        self.motion = EmotionMotionController(self.api, motion_config=motion_config,
+                                              status_cache=status_cache)
         self.current_emotion = "neutral"
 
     def set_emotion(self, emotion: str):
@@ -278,3 +246,4 @@ class ElmoEmotionManager:
 
     def stop(self):
         self.motion.stop()
+        self.api.stop()
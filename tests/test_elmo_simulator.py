@@ -0,0 +1,282 @@
+import asyncio
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from AsyncElmoV2API import AsyncElmoV2API
+from ElmoV2API import ElmoV2API
+from command_queue import CommandQueue
+from elmo_simulator import LED_COUNT, ElmoSimulator
+from fleet import Fleet
+from led_state import LedStateTracker
+
+
+@pytest.fixture
+def sim():
+    simulator = ElmoSimulator(host="127.0.0.1", http_port=0, seed=1).start()
+    yield simulator
+    simulator.stop()
+
+
+@pytest.fixture
+def api(sim):
+    client = ElmoV2API("127.0.0.1", port=sim.http_port, backoff_factor=0.0)
+    yield client
+    client.close()
+
+
+# ---------- ElmoV2API ----------
+
+def test_commands_update_the_robot_state(sim, api):
+    assert api.post_command({"op": "set_pan", "angle": 12}) is True
+    api.set_tilt(-5)
+    api.set_screen(image="happy.gif")
+    api.play_sound("hmm.wav")
+
+    status = api.status()
+    assert status["pan"] == 12
+    assert status["tilt"] == -5
+    assert status["screen"]["image"] == "happy.gif"
+    assert status["sound"] == "hmm.wav"
+
+
+def test_angles_are_clamped_to_the_limits(sim, api):
+    api.set_pan(90)
+    assert api.status()["pan"] == sim.robot.state["pan_max"]
+
+
+def test_bad_command_fails_without_raising(sim, api):
+    assert api.post_command({"op": "no_such_op"}) is False
+    assert api.metrics_snapshot()["no_such_op"]["errors"] == 1
+
+
+def test_failed_command_is_not_retried(sim, api):
+    sim.failure_rate = 1.0
+    assert api.post_command({"op": "play_sound", "name": "once.wav"}) is False
+    assert sim.requests == 1
+
+
+def test_failed_status_is_retried(sim, api):
+    sim.failure_rate = 1.0
+    assert api.status() is None
+    assert sim.requests == 3  # first try + 2 retries
+
+
+def test_dropped_connection_fails_without_raising(sim, api):
+    sim.drop_rate = 1.0
+    assert api.post_command({"op": "set_pan", "angle": 1}) is False
+    assert api.status() is None
+
+
+def test_unreachable_robot_fails_without_raising(sim, api):
+    sim.stop()
+    assert api.post_command({"op": "set_pan", "angle": 1}) is False
+    assert api.status() is None
+
+
+# ---------- batches ----------
+
+def test_pipelined_batch(sim, api):
+    with api.batch():
+        api.set_pan(10)
+        api.set_tilt(-3)
+        api.set_screen(image="sad.gif")
+
+    assert sim.robot.commands == {"set_pan": 1, "set_tilt": 1, "set_screen": 1}
+    status = api.status()
+    assert (status["pan"], status["tilt"], status["screen"]["image"]) == (10, -3, "sad.gif")
+
+
+def test_flush_batch_reports_each_command(sim, api):
+    oks = api.flush_batch([
+        {"op": "set_pan", "angle": 5},
+        {"op": "no_such_op"},
+        {"op": "set_tilt", "angle": 2},
+    ])
+    assert oks == [True, False, True]
+
+
+def test_unanswered_pipelined_commands_are_not_resent(sim, api):
+    sim.drop_rate = 1.0
+    oks = api.flush_batch([{"op": "play_sound", "name": f"{i}.wav"} for i in range(4)])
+    assert oks == [False] * 4
+    # The robot read the first request and closed the connection; nothing was posted again
+    assert sim.requests == 1
+
+
+def test_batch_route(sim):
+    with ElmoV2API("127.0.0.1", port=sim.http_port, batch_route=True) as api:
+        with api.batch():
+            api.set_pan(7)
+            api.set_tilt(4)
+            api.set_screen(text="hi")
+
+    assert sim.requests == 1
+    assert sim.robot.commands == {"set_head": 1, "set_screen": 1}
+    assert (sim.robot.state["pan"], sim.robot.state["tilt"]) == (7, 4)
+
+
+# ---------- queue and LED state ----------
+
+def test_command_queue_keeps_the_latest_setpoint(sim, api):
+    queue = CommandQueue(api)
+    for angle in range(30):
+        queue.set_head(angle, -angle / 2)
+    queue.play_sound("a.wav")
+    queue.play_sound("b.wav")
+    queue.stop()
+
+    metrics = queue.metrics()
+    assert metrics["pan"]["sent"] + metrics["pan"]["dropped"] == 30
+    assert metrics["ordered"]["sent"] == 2
+    assert (sim.robot.state["pan"], sim.robot.state["tilt"]) == (29, -14.5)
+    assert sim.robot.commands["play_sound"] == 2
+    assert sim.robot.state["sound"] == "b.wav"
+
+
+@pytest.mark.parametrize("delta_ops", [False, True])
+def test_led_state_tracker_matches_the_robot(sim, api, delta_ops):
+    tracker = LedStateTracker(api, delta_ops=delta_ops)
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (LED_COUNT, 3))
+    for _ in range(5):
+        tracker.update_leds(frame.tolist())
+        assert sim.robot.state["leds"] == frame.tolist()
+        frame[rng.integers(0, LED_COUNT, 3)] = rng.integers(0, 256, 3)
+
+    tracker.update_leds(frame.tolist())
+    tracker.update_leds(frame.tolist())
+    assert tracker.stats["unchanged"] == 1
+    assert tracker.stats["delta" if delta_ops else "full"] >= 4
+
+
+def test_led_state_tracker_behind_a_queue_resends_after_a_failure(sim, api):
+    queue = CommandQueue(api)
+    tracker = LedStateTracker(queue, delta_ops=True)
+    assert tracker.delta_ops is False
+
+    frame = [[255, 0, 0]] * LED_COUNT
+    sim.failure_rate = 1.0
+    tracker.update_leds(frame)
+    queue.flush()
+    sim.failure_rate = 0.0
+    tracker.update_leds(frame)  # the robot never showed it, so it is not skipped
+    queue.stop()
+
+    assert tracker.stats["unchanged"] == 0
+    assert sim.robot.state["leds"] == frame
+    assert queue.metrics()["leds"]["failed"] == 1
+
+
+# ---------- AsyncElmoV2API ----------
+
+def test_async_client(sim):
+    async def run():
+        async with AsyncElmoV2API("127.0.0.1", port=sim.http_port) as robot:
+            await asyncio.gather(robot.set_pan(-8), robot.set_tilt(6), robot.set_screen(image="a.gif"))
+            return await robot.status()
+
+    status = asyncio.run(run())
+    assert (status["pan"], status["tilt"], status["screen"]["image"]) == (-8, 6, "a.gif")
+
+
+def test_async_client_survives_failures(sim):
+    sim.failure_rate = 1.0
+
+    async def run():
+        async with AsyncElmoV2API("127.0.0.1", port=sim.http_port, backoff_factor=0.0) as robot:
+            await robot.play_sound("once.wav")
+            sent = sim.requests
+            return sent, await robot.status()
+
+    sent, status = asyncio.run(run())
+    assert sent == 1
+    assert status is None
+
+
+def test_async_client_survives_a_body_that_is_not_json():
+    class NotJson(BaseHTTPRequestHandler):
+        def _reply(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"OK")
+
+        do_GET = do_POST = _reply
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), NotJson)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    async def run():
+        async with AsyncElmoV2API("127.0.0.1", port=server.server_address[1]) as robot:
+            return await robot.post_command({"op": "set_pan", "angle": 1}), await robot.status()
+
+    try:
+        assert asyncio.run(run()) == (None, None)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# ---------- fleet ----------
+
+def test_fleet_reports_failed_commands(sim):
+    broken = ElmoSimulator(host="127.0.0.1", http_port=0, failure_rate=1.0).start()
+    robots = [
+        {"name": "ok", "ip": "127.0.0.1", "port": sim.http_port},
+        {"name": "broken", "ip": "127.0.0.1", "port": broken.http_port},
+    ]
+    fleet = Fleet(robots, backoff_factor=0.0)
+    try:
+        assert fleet.set_pan(3) == {"ok": True, "broken": False}
+        assert fleet.set_head(1, 2) == {"ok": True, "broken": False}
+        assert fleet.status()["broken"] is None
+        errors = {name: stats["errors"] for name, stats in fleet.stats()["robots"].items()}
+    finally:
+        fleet.close()
+        broken.stop()
+    assert errors == {"ok": 0, "broken": 3}
+
+
+# ---------- simulator ----------
+
+def test_fault_counters_add_up_under_load(sim):
+    sim.failure_rate = 0.3
+    sim.drop_rate = 0.1
+
+    def worker(_):
+        with ElmoV2API("127.0.0.1", port=sim.http_port, retries=0) as client:
+            for _ in range(25):
+                client.post_command({"op": "set_volume", "volume": 50})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(worker, range(8)))
+
+    assert sim.requests == 200
+    assert sim.robot.commands["set_volume"] == sim.requests - sim.failures - sim.drops
+
+
+def test_ports_follow_the_same_convention():
+    with ElmoSimulator(host="127.0.0.1", http_port=0) as simulator:
+        assert simulator.http_port != 0
+        assert simulator.stream_port is None and simulator.udp_port is None  # None disables
+
+    with ElmoSimulator(host="127.0.0.1", http_port=0, stream_port=0, udp_port=0) as simulator:
+        assert simulator.stream_port != 0 and simulator.udp_port != 0  # 0 picks a free port
+
+
+def test_discovery_reply():
+    with ElmoSimulator(name="elmo-test", host="127.0.0.1", http_port=0, udp_port=0) as simulator:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.settimeout(2.0)
+            sock.sendto(b"ruarobot", ("127.0.0.1", simulator.udp_port))
+            data, _ = sock.recvfrom(1024)
+        assert data.decode() == f"iamarobot;elmo;elmo-test;{simulator.http_port}"
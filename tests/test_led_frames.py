@@ -0,0 +1,62 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from led_frames import LedFrameCompiler, fast_image_to_rgb_array, image_to_rgb_array
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARAMS = [
+    {"contrast": 2.5, "color": 1.5, "brightness": 0.9},  # LedFrameCompiler defaults
+    {"contrast": 2.0, "color": 1.5, "brightness": 0.8},  # image_to_rgb_array defaults
+    {"contrast": 0.7, "color": 0.5, "brightness": 1.3},
+]
+
+
+def repo_frames():
+    frames = sorted(glob.glob(os.path.join(REPO, "Emotions", "led_grid", "*.png")))
+    return frames[::8] + sorted(glob.glob(os.path.join(REPO, "Emotions", "*.png")))
+
+
+@pytest.fixture
+def generated_frames(tmp_path):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(4):
+        pixels = rng.integers(0, 256, (90, 160, 3), dtype=np.uint8)
+        rgb = Image.fromarray(pixels)
+        paths.append(str(tmp_path / f"rgb_{i}.png"))
+        rgb.save(paths[-1])
+        paths.append(str(tmp_path / f"palette_{i}.png"))
+        rgb.quantize(colors=64 * (i + 1) - 1).save(paths[-1])
+    return paths
+
+
+def assert_same_as_pil(paths, params):
+    reference = np.stack([image_to_rgb_array(path, **params) for path in paths])
+    fast = fast_image_to_rgb_array(paths, **params)
+    diff = np.abs(reference.astype(int) - fast.astype(int))
+    assert diff.max() == 0, f"{np.count_nonzero(diff)} values differ, max {diff.max()}"
+
+
+@pytest.mark.parametrize("params", PARAMS)
+def test_fast_path_matches_pil_chain_on_repo_frames(params):
+    paths = repo_frames()
+    if not paths:
+        pytest.skip("no LED frames in Emotions/")
+    assert_same_as_pil(paths, params)
+
+
+@pytest.mark.parametrize("params", PARAMS)
+def test_fast_path_matches_pil_chain_on_generated_frames(generated_frames, params):
+    assert_same_as_pil(generated_frames, params)
+
+
+def test_compilers_agree(generated_frames):
+    directory = os.path.dirname(generated_frames[0])
+    fast = LedFrameCompiler(cache_dir=None, fast=True).compile_dir(directory)
+    pil = LedFrameCompiler(cache_dir=None, fast=False).compile_dir(directory)
+    assert fast.shape == (len(generated_frames), 13, 13, 3)
+    assert np.array_equal(fast, pil)
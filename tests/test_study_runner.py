@@ -0,0 +1,20 @@
+import importlib
+import sys
+import types
+
+
+def test_study_runner_imports(monkeypatch):
+    # pygame is only needed for the local mock robot; don't let it decide the test
+    try:
+        import pygame  # noqa: F401
+    except ImportError:
+        monkeypatch.setitem(sys.modules, "pygame", types.ModuleType("pygame"))
+    monkeypatch.delitem(sys.modules, "study_runner", raising=False)
+
+    study_runner = importlib.import_module("study_runner")
+
+    assert set(study_runner.LOCAL_AUDIO_PATHS) == {"MACHINE", "HUMAN"}
+    assert set(study_runner.AUDIO_PATHS) == {"MACHINE", "HUMAN"}
+    assert study_runner.AUDIO_PATHS["MACHINE"] == study_runner.MACHINE_VIDEO_PATH
+    assert set(study_runner.SCENARIOS) == {"MACHINE", "HUMAN"}
+    assert study_runner.LED_FRAMES_DIR